@@ -1,6 +1,6 @@
 from enum import Enum
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 
 class ParserType(str, Enum):
@@ -12,6 +12,7 @@ class DocumentStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class Document(BaseModel):
     id: str
@@ -21,8 +22,9 @@ class Document(BaseModel):
     created_at: datetime
     updated_at: datetime
     content: Optional[str] = None
-    summary: Optional[str] = None
+    summary: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    error_type: Optional[str] = None
 
 class DocumentCreate(BaseModel):
     filename: str
@@ -34,5 +36,6 @@ class DocumentResponse(BaseModel):
     parser_type: ParserType
     status: DocumentStatus
     content: Optional[str] = None
-    summary: Optional[str] = None
-    error: Optional[str] = None 
\ No newline at end of file
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None 
\ No newline at end of file
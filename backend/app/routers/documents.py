@@ -1,17 +1,21 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from enum import Enum
 import os
+import json
+import re
+import zlib
 import redis.asyncio as redis
 from dotenv import load_dotenv
 from ..services.pdf_parser import parse_pdf_pypdf #, parse_pdf_gemini, summarize_text_gemini
 from typing import List
+from functools import lru_cache
 from ..models import DocumentResponse, ParserType
 from ..services.pypdf_service import PyPDFService
 
 load_dotenv() # Load environment variables from .env
 
 router = APIRouter()
-pypdf_service = PyPDFService()
 
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
@@ -28,6 +32,11 @@ async def get_redis_connection():
         # print(f"Redis connection error: {e}")
         raise HTTPException(status_code=500, detail=f"Could not connect to Redis: {e}")
 
+@lru_cache
+def get_pypdf_service() -> PyPDFService:
+    """Build the PyPDF service on first use rather than at import time"""
+    return PyPDFService()
+
 class ParserType(str, Enum):
     PYPDF = "pypdf"
     GEMINI = "gemini"
@@ -36,7 +45,8 @@ class ParserType(str, Enum):
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
     file: UploadFile = File(...),
-    parser_type: ParserType = ParserType.PYPDF
+    parser_type: ParserType = ParserType.PYPDF,
+    pypdf_service: PyPDFService = Depends(get_pypdf_service)
 ):
     """Upload a PDF document for processing"""
     if not file.filename.endswith('.pdf'):
@@ -51,7 +61,7 @@ async def upload_document(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/{doc_id}", response_model=DocumentResponse)
-async def get_document(doc_id: str):
+async def get_document(doc_id: str, pypdf_service: PyPDFService = Depends(get_pypdf_service)):
     """Get document status and content"""
     try:
         document = await pypdf_service.get_document(doc_id)
@@ -59,6 +69,128 @@ async def get_document(doc_id: str):
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
+def parse_range(header: str, length: int) -> tuple[int, int] | None:
+    """Parse a single `bytes=` Range header into an inclusive (start, end).
+
+    Returns None for headers this endpoint does not support (other units,
+    multiple ranges, malformed specs); RFC 9110 lets the server ignore those
+    and send the full body. A valid range outside the text is a 416.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last), length - 1) if last else length - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(length - int(last), 0)
+        end = length - 1
+    if start > end or start >= length:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{length}"}
+        )
+    return start, end
+
+def gzip_chunks(chunks):
+    """Compress a stream of byte chunks on the fly"""
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def accepts_gzip(request: Request) -> bool:
+    """Whether Accept-Encoding allows gzip, honouring q-values (q=0 refuses)"""
+    qualities = {}
+    for entry in request.headers.get("accept-encoding", "").split(","):
+        coding, *params = [part.strip() for part in entry.split(";")]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+@router.get("/{doc_id}/text")
+def export_document_text(
+    doc_id: str,
+    request: Request,
+    pypdf_service: PyPDFService = Depends(get_pypdf_service)
+):
+    """Stream a document's extracted text, with Range and gzip support"""
+    length = pypdf_service.text_length(doc_id)
+    if not length:
+        if not pypdf_service.document_exists(doc_id):
+            raise HTTPException(status_code=404, detail="Document not found")
+        raise HTTPException(status_code=409, detail="Document text is not available yet")
+
+    media_type = "text/plain; charset=utf-8"
+    byte_range = parse_range(request.headers.get("range", ""), length)
+    if byte_range:
+        start, end = byte_range
+        return StreamingResponse(
+            pypdf_service.iter_text(doc_id, start, end),
+            status_code=206,
+            media_type=media_type,
+            headers={
+                "Accept-Ranges": "bytes",
+                "Content-Range": f"bytes {start}-{end}/{length}",
+                "Content-Length": str(end - start + 1),
+            }
+        )
+
+    chunks = pypdf_service.iter_text(doc_id, 0, length - 1)
+    if accepts_gzip(request):
+        return StreamingResponse(
+            gzip_chunks(chunks),
+            media_type=media_type,
+            headers={"Accept-Ranges": "bytes", "Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        )
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Accept-Ranges": "bytes", "Content-Length": str(length)}
+    )
+
+@router.get("/{doc_id}/pages.jsonl")
+def export_document_pages(
+    doc_id: str,
+    request: Request,
+    pypdf_service: PyPDFService = Depends(get_pypdf_service)
+):
+    """Stream a document's pages as JSON lines, gzip-compressed if accepted"""
+    if not pypdf_service.document_exists(doc_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    lines = (
+        (json.dumps({"page_number": number, "text": text}, ensure_ascii=False) + "\n").encode("utf-8")
+        for number, text in pypdf_service.iter_pages(doc_id)
+    )
+    media_type = "application/x-ndjson"
+    if accepts_gzip(request):
+        return StreamingResponse(
+            gzip_chunks(lines),
+            media_type=media_type,
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        )
+    return StreamingResponse(lines, media_type=media_type)
+
 @router.get("/status/{filename}")
 async def get_document_status(filename: str, redis_client: redis.Redis = Depends(get_redis_connection)):
     status = await redis_client.get(f"document:{filename}:status")
@@ -1,10 +1,11 @@
-import PyPDF2
 import io
 
 async def parse_pdf_pypdf(file_content: bytes) -> str:
     """
     Parses a PDF file using PyPDF2 and extracts text content.
     """
+    import PyPDF2
+
     text = ""
     try:
         pdf_file = io.BytesIO(file_content)
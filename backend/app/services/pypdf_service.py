@@ -1,11 +1,17 @@
 import os
-from typing import Tuple
-from pypdf import PdfReader
+import sys
+from typing import Iterator, Tuple
 from datetime import datetime
 import redis
 import json
 import uuid
 
+# Share the key layout and record encoding with the backend services
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'services', 'common')))
+
+from keys import document_key, queue_key_for
+from serialization import encode_fields, decode_fields, encode_message
+
 class PyPDFService:
     def __init__(self):
         self.redis_client = redis.Redis(
@@ -26,21 +32,21 @@ class PyPDFService:
                 "filename": filename,
                 "parser_type": "pypdf",
                 "status": "pending",
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
             }
             
             # Store document in Redis
-            self.redis_client.hset(f"document:{doc_id}", mapping=document)
+            self.redis_client.hset(document_key(doc_id), mapping=encode_fields(document))
             
             # Add to processing queue
             self.redis_client.xadd(
-                "pdf_processing_queue",
-                {
+                queue_key_for(doc_id),
+                encode_message({
                     "document_id": doc_id,
                     "filename": filename,
                     "parser_type": "pypdf"
-                }
+                })
             )
             
             return doc_id
@@ -50,6 +56,8 @@ class PyPDFService:
 
     async def extract_text(self, file_content: bytes) -> str:
         """Extract text from PDF file"""
+        from pypdf import PdfReader
+
         try:
             pdf = PdfReader(file_content)
             text = ""
@@ -61,12 +69,47 @@ class PyPDFService:
 
     async def get_document(self, doc_id: str) -> dict:
         """Get document from Redis"""
-        doc_data = self.redis_client.hgetall(f"document:{doc_id}")
+        doc_data = self.redis_client.hgetall(document_key(doc_id))
         if not doc_data:
             raise Exception("Document not found")
-        return {k.decode(): v.decode() for k, v in doc_data.items()}
+        document = decode_fields(doc_data)
+        text = self.redis_client.get(document_key(doc_id, "text"))
+        if text is not None:
+            document["content"] = text.decode("utf-8")
+        return document
+
+    def document_exists(self, doc_id: str) -> bool:
+        """Check whether a document record exists"""
+        return bool(self.redis_client.exists(document_key(doc_id)))
+
+    def text_length(self, doc_id: str) -> int:
+        """Size in bytes of a document's extracted text (0 if none yet)"""
+        return self.redis_client.strlen(document_key(doc_id, "text"))
+
+    def iter_text(self, doc_id: str, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """Yield the byte range [start, end] of a document's text in chunks"""
+        key = document_key(doc_id, "text")
+        while start <= end:
+            stop = min(start + chunk_size - 1, end)
+            chunk = self.redis_client.getrange(key, start, stop)
+            if not chunk:
+                return
+            yield chunk
+            start = stop + 1
+
+    def iter_pages(self, doc_id: str, batch_size: int = 16) -> Iterator[Tuple[int, str]]:
+        """Yield (page_number, text) pairs, fetching a few pages at a time"""
+        key = document_key(doc_id, "pages")
+        start = 0
+        while True:
+            batch = self.redis_client.lrange(key, start, start + batch_size - 1)
+            if not batch:
+                return
+            for offset, text in enumerate(batch):
+                yield start + offset + 1, text.decode("utf-8")
+            start += batch_size
 
     async def update_document(self, doc_id: str, updates: dict):
         """Update document in Redis"""
-        updates["updated_at"] = datetime.utcnow().isoformat()
-        self.redis_client.hset(f"document:{doc_id}", mapping=updates) 
\ No newline at end of file
+        updates["updated_at"] = datetime.utcnow()
+        self.redis_client.hset(document_key(doc_id), mapping=encode_fields(updates)) 
\ No newline at end of file
@@ -0,0 +1,379 @@
+"""Load and soak test for the upload/status/processing stack.
+
+Drives `POST /upload` at a Poisson arrival rate with a configurable file-size
+mix, polls `GET /status/{document_id}` for every upload until it finishes,
+and samples queue lag, Redis memory and worker RSS while it runs. The report
+holds latency percentiles and throughput, and can be saved as a baseline or
+compared against one to flag regressions.
+
+Services can be started locally (against a local Redis) or targeted where
+they already run:
+
+    python benchmarks/loadtest.py --start-services --workers 2 --rate 5 --duration 60
+    python benchmarks/loadtest.py --rate 20 --file-sizes 20k,200k,2m --save-baseline baseline.json
+    python benchmarks/loadtest.py --rate 20 --baseline baseline.json --tolerance 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+
+import httpx
+
+SERVICES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(os.path.join(SERVICES_DIR, 'common'))
+
+from keys import QUEUE_SHARDS, queue_key
+from redis_utils import RedisClient
+
+CONSUMER_GROUP = "pdf_processor_group"
+TERMINAL_STATUSES = ("completed", "failed")
+SIZE_UNITS = {"k": 1024, "m": 1024 * 1024}
+
+# Metrics compared against a baseline: (name, higher_is_worse)
+BASELINE_METRICS = [
+    ("upload_latency_ms.p99", True),
+    ("status_latency_ms.p99", True),
+    ("processing_time_ms.p99", True),
+    ("completed_per_second", False),
+]
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    if text[-1] in SIZE_UNITS:
+        return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+    return int(text)
+
+def make_pdf(target_bytes: int) -> bytes:
+    """Build a text-only PDF of roughly `target_bytes`"""
+    line = b"(The quick brown fox jumps over the lazy dog while the PDF pipeline keeps up.) '\n"
+    lines_per_page = 60
+    page_stream = b"BT /F1 10 Tf 40 800 Td 12 TL\n" + line * lines_per_page + b"ET"
+    page_count = max(1, target_bytes // (len(page_stream) + 150))
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for _ in range(page_count):
+        content_id = len(objects) + 1
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(page_stream), page_stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, page_count)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+def percentiles(samples: list[float]) -> dict[str, float] | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "p50": round(rank(50), 2),
+        "p90": round(rank(90), 2),
+        "p99": round(rank(99), 2),
+        "max": round(ordered[-1], 2),
+    }
+
+def read_rss_kb(pid: int) -> int | None:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+class LocalStack:
+    """Upload, status and processing services started as local processes"""
+
+    def __init__(self, workers: int, redis_host: str, redis_port: int, start_redis: bool,
+                 upload_port: int, status_port: int):
+        self.workers = workers
+        self.redis_host = redis_host
+        self.redis_port = redis_port
+        self.start_redis = start_redis
+        self.upload_port = upload_port
+        self.status_port = status_port
+        self.processes = []
+        self.worker_pids = []
+
+    def _spawn(self, args: list[str], env: dict[str, str]) -> subprocess.Popen:
+        process = subprocess.Popen(args, cwd=SERVICES_DIR, env={**os.environ, **env},
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.processes.append(process)
+        return process
+
+    def start(self):
+        # The services must use the Redis the load test reads, not their own default
+        env = {"REDIS_HOST": self.redis_host, "REDIS_PORT": str(self.redis_port)}
+        if self.start_redis:
+            self._spawn(["redis-server", "--port", str(self.redis_port), "--save", "", "--appendonly", "no"], {})
+        self._spawn([sys.executable, "upload-service/app/main.py"], {**env, "PORT": str(self.upload_port)})
+        self._spawn([sys.executable, "status-service/app/main.py"], {**env, "PORT": str(self.status_port)})
+        for index in range(self.workers):
+            worker = self._spawn([sys.executable, "processing-service/app/main.py"],
+                                 {**env, "CONSUMER_NAME": f"loadtest-worker-{index}"})
+            self.worker_pids.append(worker.pid)
+
+    def stop(self):
+        for process in reversed(self.processes):
+            process.send_signal(signal.SIGINT)
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+class LoadTest:
+    def __init__(self, args, worker_pids: list[int]):
+        self.args = args
+        self.worker_pids = worker_pids
+        self.files = [make_pdf(size) for size in args.file_sizes]
+        self.upload_latency = []
+        self.status_latency = []
+        self.processing_time = []
+        self.statuses = {}
+        self.errors = {}
+        self.samples = []
+        self.redis = RedisClient(host=args.redis_host, port=args.redis_port)
+
+    def _error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    async def _upload_and_poll(self, client: httpx.AsyncClient, index: int):
+        content = random.choice(self.files)
+        started = time.perf_counter()
+        try:
+            response = await client.post(
+                f"{self.args.upload_url}/upload",
+                files={"file": (f"loadtest-{index}.pdf", content, "application/pdf")},
+            )
+        except httpx.HTTPError:
+            self._error("upload_transport")
+            return
+        self.upload_latency.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            self._error(f"upload_{response.status_code}")
+            return
+        document_id = response.json()["document_id"]
+
+        deadline = started + self.args.poll_timeout
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(self.args.poll_interval)
+            poll_started = time.perf_counter()
+            try:
+                response = await client.get(f"{self.args.status_url}/status/{document_id}")
+            except httpx.HTTPError:
+                self._error("status_transport")
+                continue
+            self.status_latency.append((time.perf_counter() - poll_started) * 1000)
+            if response.status_code != 200:
+                self._error(f"status_{response.status_code}")
+                continue
+            status = response.json().get("status", "").lower()
+            if status in TERMINAL_STATUSES:
+                self.processing_time.append((time.perf_counter() - started) * 1000)
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+                return
+        self.statuses["timed_out"] = self.statuses.get("timed_out", 0) + 1
+
+    def _queue_lag(self) -> int:
+        lag = 0
+        for shard in range(QUEUE_SHARDS):
+            key = queue_key(shard)
+            try:
+                groups = self.redis.client.xinfo_groups(key)
+            except Exception:
+                continue
+            for group in groups:
+                if group.get("name") in (CONSUMER_GROUP, CONSUMER_GROUP.encode()):
+                    lag += (group.get("lag") or 0) + group.get("pending", 0)
+        return lag
+
+    def _redis_used_memory(self) -> int | None:
+        try:
+            return self.redis.client.info("memory").get("used_memory")
+        except Exception:
+            return None
+
+    async def _sample(self, stop: asyncio.Event, started: float):
+        while not stop.is_set():
+            self.samples.append({
+                "t": round(time.perf_counter() - started, 1),
+                "queue_lag": self._queue_lag(),
+                "redis_used_memory": self._redis_used_memory(),
+                "worker_rss_kb": {pid: read_rss_kb(pid) for pid in self.worker_pids},
+            })
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.args.sample_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> dict:
+        limits = httpx.Limits(max_connections=self.args.max_connections)
+        async with httpx.AsyncClient(timeout=self.args.request_timeout, limits=limits) as client:
+            stop = asyncio.Event()
+            started = time.perf_counter()
+            sampler = asyncio.create_task(self._sample(stop, started))
+            tasks = []
+            index = 0
+            while time.perf_counter() - started < self.args.duration:
+                tasks.append(asyncio.create_task(self._upload_and_poll(client, index)))
+                index += 1
+                await asyncio.sleep(random.expovariate(self.args.rate))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await sampler
+
+        peak_rss = {}
+        for sample in self.samples:
+            for pid, rss in sample["worker_rss_kb"].items():
+                if rss is not None:
+                    peak_rss[pid] = max(peak_rss.get(pid, 0), rss)
+        return {
+            "config": {
+                "rate": self.args.rate,
+                "duration": self.args.duration,
+                "file_sizes": self.args.file_sizes,
+                "poll_interval": self.args.poll_interval,
+                "workers": len(self.worker_pids),
+            },
+            "uploads": index,
+            "elapsed_s": round(elapsed, 2),
+            "completed_per_second": round(self.statuses.get("completed", 0) / elapsed, 3),
+            "statuses": self.statuses,
+            "errors": self.errors,
+            "upload_latency_ms": percentiles(self.upload_latency),
+            "status_latency_ms": percentiles(self.status_latency),
+            "processing_time_ms": percentiles(self.processing_time),
+            "max_queue_lag": max((s["queue_lag"] for s in self.samples), default=0),
+            "max_redis_used_memory": max((s["redis_used_memory"] for s in self.samples if s["redis_used_memory"]), default=None),
+            "peak_worker_rss_kb": peak_rss,
+            "samples": self.samples,
+        }
+
+def lookup(report: dict, path: str):
+    value = report
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Describe every tracked metric that is worse than the baseline allows"""
+    regressions = []
+    for path, higher_is_worse in BASELINE_METRICS:
+        current, previous = lookup(report, path), lookup(baseline, path)
+        if current is None or not previous:
+            continue
+        if higher_is_worse and current > previous * (1 + tolerance):
+            regressions.append(f"{path}: {current} > {previous} (+{tolerance:.0%})")
+        elif not higher_is_worse and current < previous * (1 - tolerance):
+            regressions.append(f"{path}: {current} < {previous} (-{tolerance:.0%})")
+    return regressions
+
+def wait_until_ready(urls: list[str], timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    for url in urls:
+        while True:
+            try:
+                if httpx.get(f"{url}/ready", timeout=1.0).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+            time.sleep(0.2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load/soak test the PDF processing stack")
+    parser.add_argument("--upload-url", default="http://localhost:8001")
+    parser.add_argument("--status-url", default="http://localhost:8002")
+    parser.add_argument("--redis-host", default=os.getenv("REDIS_HOST", "localhost"))
+    parser.add_argument("--redis-port", type=int, default=int(os.getenv("REDIS_PORT", 6379)))
+    parser.add_argument("--rate", type=float, default=2.0, help="Mean uploads per second (Poisson arrivals)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to keep generating uploads")
+    parser.add_argument("--file-sizes", type=lambda v: [parse_size(s) for s in v.split(",")], default="50k,500k",
+                        help="Comma-separated file sizes to pick from uniformly, e.g. 20k,200k,2m")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds between status polls")
+    parser.add_argument("--poll-timeout", type=float, default=120.0, help="Give up polling a document after this")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between resource samples")
+    parser.add_argument("--request-timeout", type=float, default=30.0)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--worker-pid", type=int, action="append", default=[], help="Worker pid to sample RSS for")
+    parser.add_argument("--start-services", action="store_true", help="Start upload/status/processing locally")
+    parser.add_argument("--start-redis", action="store_true", help="Also start a throwaway local redis-server")
+    parser.add_argument("--workers", type=int, default=1, help="Processing workers to start with --start-services")
+    parser.add_argument("--output", help="Write the full report (with samples) to this JSON file")
+    parser.add_argument("--save-baseline", help="Write the report as a baseline JSON file")
+    parser.add_argument("--baseline", help="Compare against a baseline JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    stack = None
+    worker_pids = list(args.worker_pid)
+    if args.start_services:
+        stack = LocalStack(
+            args.workers,
+            args.redis_host,
+            args.redis_port,
+            args.start_redis,
+            int(args.upload_url.rsplit(":", 1)[1]),
+            int(args.status_url.rsplit(":", 1)[1]),
+        )
+        stack.start()
+        worker_pids += stack.worker_pids
+        wait_until_ready([args.upload_url, args.status_url])
+
+    try:
+        report = asyncio.run(LoadTest(args, worker_pids).run())
+    finally:
+        if stack:
+            stack.stop()
+
+    summary = {key: value for key, value in report.items() if key != "samples"}
+    print(json.dumps(summary, indent=2))
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions against baseline:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Encode/decode cost and size of the packed format vs. the string scheme.
+
+Compares a metadata record (with an uploaded file of --file-size bytes) and a
+stream message, encoded the way the services did before (str()/isoformat()
+plus base64 for the file, JSON for messages) and with common/serialization.py.
+
+Usage:
+    python benchmarks/message_encoding.py --file-size 1048576 --number 200
+"""
+import argparse
+import base64
+import datetime
+import json
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'common')))
+
+from serialization import encode_fields, decode_fields, encode_message, decode_message
+
+def legacy_encode_fields(metadata: dict) -> dict[bytes, bytes]:
+    encoded = {}
+    for key, value in metadata.items():
+        if isinstance(value, datetime.datetime):
+            value = value.isoformat()
+        elif isinstance(value, bytes):
+            value = base64.b64encode(value).decode('utf-8')
+        encoded[key.encode()] = str(value).encode()
+    return encoded
+
+def legacy_decode_fields(mapping: dict[bytes, bytes]) -> dict:
+    metadata = {k.decode(): v.decode() for k, v in mapping.items()}
+    for key in ('created_at', 'updated_at'):
+        metadata[key] = datetime.datetime.fromisoformat(metadata[key])
+    metadata['file_content'] = base64.b64decode(metadata['file_content'])
+    return metadata
+
+def as_redis_reply(mapping: dict[str, bytes]) -> dict[bytes, bytes]:
+    """Shape an encoded mapping the way HGETALL/XREADGROUP hand it back"""
+    return {key.encode(): value for key, value in mapping.items()}
+
+def size(mapping: dict) -> int:
+    return sum(len(k) + len(v) for k, v in mapping.items())
+
+def report(name: str, number: int, encode, decode, encoded: dict):
+    encode_us = timeit.timeit(encode, number=number) / number * 1e6
+    decode_us = timeit.timeit(decode, number=number) / number * 1e6
+    print(f"{name:24} encode {encode_us:10.1f} us  decode {decode_us:10.1f} us  {size(encoded):>10} bytes")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serialization schemes")
+    parser.add_argument("--file-size", type=int, default=1024 * 1024, help="Uploaded file size in bytes")
+    parser.add_argument("--number", type=int, default=200, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    now = datetime.datetime.utcnow()
+    metadata = {
+        "id": "0b6f1a52-3d0e-4f55-9a57-3c4e8d1f2a10",
+        "filename": "quarterly-report.pdf",
+        "parser_type": "pypdf",
+        "status": "pending",
+        "created_at": now,
+        "updated_at": now,
+        "file_content": os.urandom(args.file_size),
+    }
+    message = {
+        "document_id": metadata["id"],
+        "filename": metadata["filename"],
+        "parser_type": "pypdf",
+    }
+
+    legacy = legacy_encode_fields(metadata)
+    report("metadata (legacy)", args.number,
+           lambda: legacy_encode_fields(metadata), lambda: legacy_decode_fields(legacy), legacy)
+    packed = as_redis_reply(encode_fields(metadata))
+    report("metadata (packed)", args.number,
+           lambda: encode_fields(metadata), lambda: decode_fields(packed), packed)
+
+    legacy_message = {b"message": json.dumps(message).encode()}
+    report("message (json)", args.number * 50,
+           lambda: json.dumps(message), lambda: json.loads(legacy_message[b"message"]), legacy_message)
+    packed_message = as_redis_reply(encode_message(message))
+    report("message (packed)", args.number * 50,
+           lambda: encode_message(message), lambda: decode_message(packed_message), packed_message)
+
+if __name__ == "__main__":
+    main()
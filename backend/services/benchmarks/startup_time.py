@@ -0,0 +1,89 @@
+"""Cold-start benchmark for the backend services.
+
+Each run imports a service's ``app/main.py`` in a fresh interpreter and
+reports how long it took until the module (and its FastAPI app) was ready.
+Results can be saved as a baseline and later runs compared against it.
+
+Usage:
+    python benchmarks/startup_time.py --runs 10
+    python benchmarks/startup_time.py --save benchmarks/startup_baseline.json
+    python benchmarks/startup_time.py --baseline benchmarks/startup_baseline.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVICES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+SERVICES = ["upload-service", "status-service", "processing-service"]
+
+# Runs inside the child interpreter; prints the elapsed import time in ms.
+# Like `python app/main.py`, the script's directory goes first on sys.path so
+# modules next to main.py (cache, sandbox, ...) resolve.
+PROBE = """
+import importlib.util, os, sys, time
+sys.path.insert(0, os.path.dirname(sys.argv[1]))
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location("main", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+print((time.perf_counter() - start) * 1000)
+"""
+
+def measure(service: str) -> float:
+    """Import a service's entry module in a fresh interpreter, return ms"""
+    main_path = os.path.join(SERVICES_DIR, service, 'app', 'main.py')
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, main_path],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+def run(services: list[str], runs: int) -> dict[str, dict[str, float]]:
+    results = {}
+    for service in services:
+        samples = [measure(service) for _ in range(runs)]
+        results[service] = {
+            "median_ms": round(statistics.median(samples), 2),
+            "min_ms": round(min(samples), 2),
+            "max_ms": round(max(samples), 2),
+        }
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure service cold-start time")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per service")
+    parser.add_argument("--service", action="append", choices=SERVICES, help="Limit to a service (repeatable)")
+    parser.add_argument("--save", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against a previously saved JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = run(args.service or SERVICES, args.runs)
+    for service, stats in results.items():
+        print(f"{service:20} median {stats['median_ms']:8.2f} ms  min {stats['min_ms']:8.2f} ms  max {stats['max_ms']:8.2f} ms")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = []
+        for service, stats in results.items():
+            if service not in baseline:
+                continue
+            limit = baseline[service]["median_ms"] * (1 + args.tolerance)
+            if stats["median_ms"] > limit:
+                regressions.append(f"{service}: {stats['median_ms']:.2f} ms > {limit:.2f} ms")
+        if regressions:
+            print("Startup regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
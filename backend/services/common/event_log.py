@@ -0,0 +1,111 @@
+"""Append-only log of document processing outcomes.
+
+When EVENT_LOG_DIR is set, each worker appends one msgpack-encoded event per
+terminal transition to its own segment file. The open segment is named
+`<writer>-<started>.open` and is sealed (renamed to `.msgpack`) once it
+grows past EVENT_LOG_SEGMENT_BYTES or EVENT_LOG_SEGMENT_SECONDS, so a
+compactor only ever reads files that no longer change. A torn record at the
+end of a segment (e.g. after a crash) is ignored by the reader.
+"""
+import glob
+import os
+import time
+
+import msgpack
+
+EVENT_LOG_DIR = os.getenv("EVENT_LOG_DIR")
+EVENT_LOG_SEGMENT_BYTES = int(os.getenv("EVENT_LOG_SEGMENT_BYTES", 16 * 1024 * 1024))
+EVENT_LOG_SEGMENT_SECONDS = float(os.getenv("EVENT_LOG_SEGMENT_SECONDS", 300))
+
+OPEN_SUFFIX = ".open"
+SEALED_SUFFIX = ".msgpack"
+
+def segments_dir(log_dir: str | None = None) -> str:
+    return os.path.join(log_dir or EVENT_LOG_DIR, "segments")
+
+def seal_segment(path: str) -> str:
+    """Mark a segment as complete so it can be compacted"""
+    sealed = path[:-len(OPEN_SUFFIX)] + SEALED_SUFFIX
+    os.replace(path, sealed)
+    return sealed
+
+def sealed_segments(log_dir: str | None = None) -> list[str]:
+    """Sealed segments, oldest first within each writer"""
+    return sorted(glob.glob(os.path.join(segments_dir(log_dir), f"*{SEALED_SUFFIX}")))
+
+def seal_idle_segments(idle_seconds: float, log_dir: str | None = None) -> list[str]:
+    """Seal open segments not written to for `idle_seconds`, e.g. of dead workers.
+
+    With `idle_seconds` above EVENT_LOG_SEGMENT_SECONDS a live writer never
+    appends to a segment sealed here: it rotates before its next write.
+    """
+    cutoff = time.time() - idle_seconds
+    sealed = []
+    for path in glob.glob(os.path.join(segments_dir(log_dir), f"*{OPEN_SUFFIX}")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                sealed.append(seal_segment(path))
+        except FileNotFoundError:
+            # Sealed by its writer in the meantime
+            pass
+    return sealed
+
+def read_segment(path: str):
+    """Yield the events of a segment, skipping a torn record at its end"""
+    with open(path, 'rb') as f:
+        unpacker = msgpack.Unpacker(f, raw=False)
+        yield from unpacker
+
+class EventLogWriter:
+    """Appends events to this writer's segments under `log_dir`.
+
+    `writer` must be unique among processes sharing the directory, e.g. the
+    worker's consumer name.
+    """
+
+    def __init__(self, log_dir: str, writer: str,
+                 segment_bytes: int = EVENT_LOG_SEGMENT_BYTES,
+                 segment_seconds: float = EVENT_LOG_SEGMENT_SECONDS):
+        self.directory = segments_dir(log_dir)
+        self.writer = writer.replace(os.sep, "_")
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self._file = None
+        self._opened_at = 0.0
+        os.makedirs(self.directory, exist_ok=True)
+        # Segments left open by a previous run of this writer are complete
+        for path in glob.glob(os.path.join(self.directory, f"{glob.escape(self.writer)}-*{OPEN_SUFFIX}")):
+            seal_segment(path)
+
+    def _open(self):
+        self._opened_at = time.time()
+        name = f"{self.writer}-{int(self._opened_at * 1000):015d}{OPEN_SUFFIX}"
+        self._file = open(os.path.join(self.directory, name), 'ab', buffering=0)
+
+    def append(self, event: dict):
+        """Write one event, rotating the segment when it is due"""
+        if self._file is not None and (
+            self._file.tell() >= self.segment_bytes
+            or time.time() - self._opened_at >= self.segment_seconds
+        ):
+            self.rotate()
+        if self._file is None:
+            self._open()
+        # One unbuffered write per event, so records are never interleaved
+        self._file.write(msgpack.packb(event, use_bin_type=True))
+
+    def rotate(self):
+        """Seal the current segment; the next event starts a new one"""
+        if self._file is None:
+            return
+        path = self._file.name
+        self._file.close()
+        self._file = None
+        try:
+            seal_segment(path)
+        except FileNotFoundError:
+            # Already sealed by the compactor while this writer was idle
+            pass
+
+    def close(self):
+        self.rotate()
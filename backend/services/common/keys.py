@@ -0,0 +1,39 @@
+"""Redis key layout shared by all services.
+
+Keys that belong to one document carry its id as a hash tag
+(`document:{<id>}`, `document:{<id>}:text`, ...), so Redis Cluster stores them
+in the same slot and multi-key operations on a document stay on one shard.
+The processing queue is split into QUEUE_SHARDS streams, each with its own
+hash tag, so queue traffic spreads across the cluster.
+"""
+import os
+import zlib
+
+PROCESSING_QUEUE = "pdf_processing_queue"
+QUEUE_SHARDS = int(os.getenv("QUEUE_SHARDS", 1))
+
+# Pub/sub channel announcing the id of every document whose status changed
+STATUS_CHANNEL = "document_status_changes"
+
+def document_key(document_id: str, suffix: str | None = None) -> str:
+    """Key of a document's record, or of a related key such as `text`"""
+    key = f"document:{{{document_id}}}"
+    return f"{key}:{suffix}" if suffix else key
+
+def queue_key(shard: int, queue_name: str = PROCESSING_QUEUE, shards: int = QUEUE_SHARDS) -> str:
+    """Stream key of one queue shard; a single shard keeps the plain name"""
+    if shards <= 1:
+        return queue_name
+    return f"{queue_name}:{{{shard}}}"
+
+def queue_shard(document_id: str, shards: int = QUEUE_SHARDS) -> int:
+    """Shard that a document's messages are routed to"""
+    return zlib.crc32(document_id.encode()) % max(shards, 1)
+
+def queue_key_for(document_id: str, queue_name: str = PROCESSING_QUEUE, shards: int = QUEUE_SHARDS) -> str:
+    """Stream key that a document's processing message belongs on"""
+    return queue_key(queue_shard(document_id, shards), queue_name, shards)
+
+def worker_shards(worker_index: int, worker_count: int, shards: int = QUEUE_SHARDS) -> list[int]:
+    """Queue shards consumed by one of `worker_count` workers"""
+    return [shard for shard in range(max(shards, 1)) if shard % worker_count == worker_index]
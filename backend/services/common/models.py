@@ -1,6 +1,6 @@
 from enum import Enum
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 import uuid
 
@@ -13,6 +13,7 @@ class DocumentStatus(str, Enum):
     PROCESSING = "processing"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
 
 class DocumentMetadata(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -22,8 +23,13 @@ class DocumentMetadata(BaseModel):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     content: Optional[bytes] = None
-    summary: Optional[str] = None
+    summary: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
+    error_type: Optional[str] = None
+
+    def to_record(self) -> dict:
+        """Field values for storage in Redis, skipping unset optionals"""
+        return {name: value for name, value in self.__dict__.items() if value is not None}
 
 class DocumentUploadRequest(BaseModel):
     filename: str
@@ -40,5 +46,5 @@ class DocumentProcessingResponse(BaseModel):
     document_id: str
     status: DocumentStatus
     content: Optional[str] = None
-    summary: Optional[str] = None
+    summary: Optional[Dict[str, Any]] = None
     error: Optional[str] = None 
\ No newline at end of file
@@ -1,8 +1,15 @@
 import os
-import redis
-import datetime
 import logging
 
+try:
+    from .keys import STATUS_CHANNEL, document_key
+    from .models import DocumentStatus
+    from .serialization import encode_fields, decode_fields, encode_message, decode_message, pack_value
+except ImportError:
+    from keys import STATUS_CHANNEL, document_key
+    from models import DocumentStatus
+    from serialization import encode_fields, decode_fields, encode_message, decode_message, pack_value
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -10,32 +17,138 @@ logging.basicConfig(
 )
 logger = logging.getLogger("redis-utils")
 
+# Statuses after which a document is never processed again
+TERMINAL_STATUSES = (DocumentStatus.COMPLETED.value, DocumentStatus.FAILED.value, DocumentStatus.CANCELLED.value)
+
+# Claim a document for processing under a lease.
+# KEYS[1]: document record
+# ARGV[1]: lease owner, ARGV[2]: lease in ms, ARGV[3]: encoded `processing`
+# status, ARGV[4..]: encoded terminal statuses (packed and legacy forms).
+# Returns {state, fencing token}; state is claimed, done, leased or missing.
+CLAIM_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return {'missing', 0}
+end
+local status = redis.call('HGET', KEYS[1], 'status')
+for i = 4, #ARGV do
+    if status == ARGV[i] then
+        return {'done', 0}
+    end
+end
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local lease_until = tonumber(redis.call('HGET', KEYS[1], 'lease_until') or '0')
+if lease_until > now then
+    return {'leased', 0}
+end
+local token = redis.call('HINCRBY', KEYS[1], 'fence', 1)
+redis.call('HSET', KEYS[1], 'lease_owner', ARGV[1], 'lease_until', now + tonumber(ARGV[2]), 'status', ARGV[3])
+return {'claimed', token}
+"""
+
+# Cancel a document on behalf of a user.
+# KEYS[1]: document record
+# ARGV[1]: encoded `processing` status, ARGV[2]: encoded `cancelled` status,
+# ARGV[3..]: encoded terminal statuses (packed and legacy forms).
+# Queued documents are cancelled outright (and any claim fenced off);
+# documents being processed get a flag their worker polls for.
+# Returns missing, done, requested or cancelled.
+CANCEL_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 'missing'
+end
+local status = redis.call('HGET', KEYS[1], 'status')
+for i = 3, #ARGV do
+    if status == ARGV[i] then
+        return 'done'
+    end
+end
+if status == ARGV[1] then
+    redis.call('HSET', KEYS[1], 'cancel_requested', '1')
+    return 'requested'
+end
+redis.call('HINCRBY', KEYS[1], 'fence', 1)
+redis.call('HSET', KEYS[1], 'status', ARGV[2])
+return 'cancelled'
+"""
+
+# Write a document's outcome if the caller still holds the newest token.
+# KEYS[1]: document record, KEYS[2]: text, KEYS[3]: pages
+# ARGV[1]: fencing token, ARGV[2]: number of encoded field/value pairs,
+# then the pairs, then the page texts (if any).
+# Returns 1 when written, 0 when the caller's token is stale.
+FINISH_SCRIPT = """
+if redis.call('HGET', KEYS[1], 'fence') ~= ARGV[1] then
+    return 0
+end
+local pages_start = 3 + tonumber(ARGV[2]) * 2
+if pages_start <= #ARGV then
+    redis.call('DEL', KEYS[2], KEYS[3])
+    for i = pages_start, #ARGV do
+        redis.call('APPEND', KEYS[2], ARGV[i] .. '\\n')
+        redis.call('RPUSH', KEYS[3], ARGV[i])
+    end
+end
+for i = 3, pages_start - 1, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('HDEL', KEYS[1], 'lease_owner', 'lease_until', 'cancel_requested')
+return 1
+"""
+
 class RedisClient:
     def __init__(self, host=None, port=None, db=None):
         self.host = host or os.getenv("REDIS_HOST", "redis")
         self.port = port or int(os.getenv("REDIS_PORT", 6379))
         self.db = db or int(os.getenv("REDIS_DB", 0))
-        
-        self.client = redis.Redis(
-            host=self.host,
-            port=self.port,
-            db=self.db
-        )
+        # Comma-separated host:port seed nodes; when set, talk to Redis Cluster
+        self.cluster_nodes = os.getenv("REDIS_CLUSTER_NODES")
+        self.warmed = False
+        self._client = None
+        self._scripts = {}
+
+    @property
+    def client(self):
+        """Underlying Redis connection, created on first use.
+
+        Importing redis and building the connection pool is deferred so that
+        importing this module stays cheap for every service.
+        """
+        if self._client is None:
+            if self.cluster_nodes:
+                from redis.cluster import RedisCluster, ClusterNode
+                startup_nodes = []
+                for node in self.cluster_nodes.split(","):
+                    host, _, port = node.strip().rpartition(":")
+                    startup_nodes.append(ClusterNode(host, int(port)))
+                self._client = RedisCluster(startup_nodes=startup_nodes)
+            else:
+                import redis
+                self._client = redis.Redis(
+                    host=self.host,
+                    port=self.port,
+                    db=self.db
+                )
+        return self._client
+
+    def warm_up(self) -> bool:
+        """Open a pooled connection ahead of the first request.
+
+        Returns True once Redis has answered a PING; failures are logged and
+        reported as False so callers can retry from a readiness probe.
+        """
+        try:
+            self.client.ping()
+            self.warmed = True
+        except Exception as e:
+            logger.warning(f"Redis warm-up failed: {str(e)}")
+            self.warmed = False
+        return self.warmed
     
     def store_document_metadata(self, document_id: str, metadata: dict[str, any]):
         """Store document metadata in Redis hash"""
         try:
-            # Convert all values to strings for Redis
-            redis_metadata = {}
-            for key, value in metadata.items():
-                if isinstance(value, datetime.datetime):
-                    redis_metadata[key] = value.isoformat()
-                elif isinstance(value, bytes):
-                    redis_metadata[key] = value.decode('utf-8')
-                else:
-                    redis_metadata[key] = str(value)
-            
-            self.client.hset(f"document:{document_id}", mapping=redis_metadata)
+            self.client.hset(document_key(document_id), mapping=encode_fields(metadata))
         except Exception as e:
             logger.error(f"Error storing document metadata for {document_id}: {str(e)}")
             raise
@@ -43,37 +156,158 @@ class RedisClient:
     def get_document_metadata(self, document_id: str) -> dict[str, any] | None:
         """Get metadata for a specific document"""
         try:
-            metadata = self.client.hgetall(f"document:{document_id}")
+            metadata = self.client.hgetall(document_key(document_id))
             if not metadata:
                 return None
-            
-            # Convert datetime strings back to datetime objects
-            metadata = {k.decode(): v.decode() for k, v in metadata.items()}
-            if 'created_at' in metadata:
-                metadata['created_at'] = datetime.fromisoformat(metadata['created_at'])
-            if 'updated_at' in metadata:
-                metadata['updated_at'] = datetime.fromisoformat(metadata['updated_at'])
-            return metadata
+            return decode_fields(metadata)
         except Exception as e:
             logger.error(f"Error getting document metadata for {document_id}: {str(e)}")
             raise
     
+    def get_document_fields(self, document_id: str, fields: list[str]) -> dict[str, any] | None:
+        """Get selected metadata fields, leaving large values in Redis"""
+        try:
+            values = self.client.hmget(document_key(document_id), fields)
+            if all(value is None for value in values):
+                return None
+            return decode_fields({
+                name: value for name, value in zip(fields, values) if value is not None
+            })
+        except Exception as e:
+            logger.error(f"Error getting document fields for {document_id}: {str(e)}")
+            raise
+    
     def update_document_metadata(self, document_id: str, updates: dict[str, any]):
         """Update document metadata in Redis hash"""
         try:
-            self.client.hset(f"document:{document_id}", mapping=updates)
+            self.client.hset(document_key(document_id), mapping=encode_fields(updates))
         except Exception as e:
             logger.error(f"Error updating document metadata for {document_id}: {str(e)}")
             raise
+        if "status" in updates:
+            self.publish_status_change(document_id)
+
+    def publish_status_change(self, document_id: str):
+        """Tell subscribers (e.g. status caches) that a document changed.
+
+        Best effort: subscribers must tolerate missed events.
+        """
+        try:
+            self.client.publish(STATUS_CHANNEL, document_id)
+        except Exception as e:
+            logger.warning(f"Error publishing status change for {document_id}: {str(e)}")
     
+    def _script(self, source: str):
+        """Registered Lua script, loaded once per client"""
+        if source not in self._scripts:
+            self._scripts[source] = self.client.register_script(source)
+        return self._scripts[source]
+
+    def claim_document(self, document_id: str, owner: str, lease_ms: int) -> tuple[str, int]:
+        """Atomically claim a document for processing.
+
+        Returns the claim state (`claimed`, `done`, `leased` or `missing`) and,
+        when claimed, a fencing token that must accompany the final write.
+        """
+        terminal = [pack_value(status) for status in TERMINAL_STATUSES] + list(TERMINAL_STATUSES)
+        try:
+            state, token = self._script(CLAIM_SCRIPT)(
+                keys=[document_key(document_id)],
+                args=[owner, lease_ms, pack_value(DocumentStatus.PROCESSING.value), *terminal]
+            )
+        except Exception as e:
+            logger.error(f"Error claiming document {document_id}: {str(e)}")
+            raise
+        state = state.decode()
+        if state == "claimed":
+            self.publish_status_change(document_id)
+        return state, int(token)
+
+    def cancel_document(self, document_id: str) -> str:
+        """Cancel a queued document or ask its worker to stop.
+
+        Returns `cancelled`, `requested` (the worker will stop and record the
+        cancellation), `done` (already finished) or `missing`.
+        """
+        terminal = [pack_value(status) for status in TERMINAL_STATUSES] + list(TERMINAL_STATUSES)
+        try:
+            state = self._script(CANCEL_SCRIPT)(
+                keys=[document_key(document_id)],
+                args=[pack_value(DocumentStatus.PROCESSING.value), pack_value(DocumentStatus.CANCELLED.value), *terminal]
+            )
+        except Exception as e:
+            logger.error(f"Error cancelling document {document_id}: {str(e)}")
+            raise
+        state = state.decode()
+        if state == "cancelled":
+            self.publish_status_change(document_id)
+        return state
+
+    def finish_document(self, document_id: str, token: int, updates: dict[str, any], pages: list[str] | None = None) -> bool:
+        """Record a document's outcome, rejecting writers with a stale token.
+
+        Extracted text is stored as one string key plus one list entry per
+        page, so readers can fetch it in ranges (GETRANGE/LRANGE) instead of
+        loading it whole. All keys share the document's hash tag, so the
+        script stays on one shard.
+        """
+        fields = encode_fields(updates)
+        args = [token, len(fields)]
+        for name, value in fields.items():
+            args.extend((name, value))
+        args.extend(pages or ())
+        try:
+            written = self._script(FINISH_SCRIPT)(
+                keys=[document_key(document_id), document_key(document_id, "text"), document_key(document_id, "pages")],
+                args=args
+            )
+        except Exception as e:
+            logger.error(f"Error finishing document {document_id}: {str(e)}")
+            raise
+        if written:
+            self.publish_status_change(document_id)
+        return bool(written)
+
+    def get_text_preview(self, document_id: str, length: int = 200) -> str | None:
+        """Return the first `length` characters of a document's text"""
+        try:
+            # Up to 4 bytes per UTF-8 character; drop a split trailing character
+            data = self.client.getrange(document_key(document_id, "text"), 0, length * 4 - 1)
+            if not data:
+                return None
+            return data.decode('utf-8', errors='ignore')[:length]
+        except Exception as e:
+            logger.error(f"Error reading text preview for {document_id}: {str(e)}")
+            raise
+
     def add_to_queue(self, queue_name: str, message: dict[str, any]):
         """Add a message to a Redis Stream"""
         try:
-            self.client.xadd(queue_name, message)
+            self.client.xadd(queue_name, encode_message(message))
         except Exception as e:
             logger.error(f"Error adding message to queue {queue_name}: {str(e)}")
             raise
     
+    def acknowledge_message(self, queue_name: str, group: str, message_id):
+        """Acknowledge a handled message and drop it from the stream"""
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.xack(queue_name, group, message_id)
+            pipe.xdel(queue_name, message_id)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error acknowledging message {message_id} on {queue_name}: {str(e)}")
+            raise
+
+    def claim_stale_messages(self, stream_key: str, group: str, consumer: str, min_idle_ms: int, count: int = 1) -> list[tuple[str, dict[str, any]]]:
+        """Take over messages another consumer read but never acknowledged"""
+        try:
+            _, messages, *_ = self.client.xautoclaim(stream_key, group, consumer, min_idle_ms, count=count)
+            return [(message_id, decode_message(data)) for message_id, data in messages if data]
+        except Exception as e:
+            logger.error(f"Error reclaiming messages from {stream_key}: {str(e)}")
+            raise
+
     def read_from_queue(self, queue_name: str, block=0, count=1, last_id='>'):
         """Read messages from a Redis Stream"""
         try:
@@ -94,10 +328,13 @@ class RedisClient:
         Returns:
             List of tuples containing message IDs and decoded message data.
         """
+        import redis
+
         try:
             # Create consumer group if it doesn't exist
             try:
-                self.client.xgroup_create(stream_key, group, mkstream=True)
+                # Start from the beginning so messages queued before the group existed are kept
+                self.client.xgroup_create(stream_key, group, id='0', mkstream=True)
             except redis.exceptions.ResponseError as e:
                 if "BUSYGROUP" not in str(e):
                     raise
@@ -118,14 +355,12 @@ class RedisClient:
             results = []
             for _, messages in entries:
                 for message_id, message_data in messages:
-                    # Convert message data to dictionary
-                    decoded_message = dict(message_data)
-                    results.append((message_id, decoded_message))
+                    results.append((message_id, decode_message(message_data)))
             
             return results
         except Exception as e:
             logger.error(f"Error in stream consumer for {stream_key}: {str(e)}")
             raise
 
-# Singleton Redis client
-redis_client = RedisClient()
\ No newline at end of file
+# Singleton Redis client (the connection itself is opened lazily)
+redis_client = RedisClient()
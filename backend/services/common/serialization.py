@@ -0,0 +1,75 @@
+"""Compact, versioned encoding for Redis stream messages and metadata hashes.
+
+Every value is msgpack-encoded and prefixed with a marker byte and the format
+version. 0xC1 is never produced by msgpack and is not valid UTF-8, so records
+and messages written before this format (plain UTF-8 strings) are still
+recognised and decoded.
+"""
+import datetime
+from enum import Enum
+import msgpack
+
+MARKER = b"\xc1"
+FORMAT_VERSION = 1
+_PREFIX = MARKER + bytes([FORMAT_VERSION])
+
+# Stream entries carry the whole message packed into this single field
+MESSAGE_FIELD = "m"
+
+# Fields that legacy records stored as ISO-8601 strings
+_LEGACY_DATETIME_FIELDS = ("created_at", "updated_at")
+
+def _default(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return msgpack.Timestamp.from_datetime(value)
+    raise TypeError(f"Cannot serialize value of type {type(value).__name__}")
+
+def pack_value(value) -> bytes:
+    """Encode a single value in the current format"""
+    return _PREFIX + msgpack.packb(value, default=_default, use_bin_type=True)
+
+def unpack_value(raw: bytes):
+    """Decode a single value, accepting both packed and legacy string values"""
+    if not raw.startswith(MARKER):
+        return raw.decode('utf-8')
+    version = raw[1]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported serialization version: {version}")
+    value = msgpack.unpackb(raw[2:], raw=False, timestamp=3)
+    if isinstance(value, datetime.datetime):
+        # Datetimes are stored in UTC and handed back naive, like the models
+        value = value.replace(tzinfo=None)
+    return value
+
+def encode_fields(mapping: dict[str, any]) -> dict[str, bytes]:
+    """Encode a metadata mapping for HSET, dropping None values"""
+    return {key: pack_value(value) for key, value in mapping.items() if value is not None}
+
+def decode_fields(mapping: dict[bytes, bytes]) -> dict[str, any]:
+    """Decode an HGETALL result into native Python values"""
+    fields = {}
+    for key, raw in mapping.items():
+        name = key.decode() if isinstance(key, bytes) else key
+        value = unpack_value(raw)
+        if name in _LEGACY_DATETIME_FIELDS and isinstance(value, str):
+            value = datetime.datetime.fromisoformat(value)
+        fields[name] = value
+    return fields
+
+def encode_message(message: dict[str, any]) -> dict[str, bytes]:
+    """Encode a stream message as a single packed field for XADD"""
+    return {MESSAGE_FIELD: pack_value(message)}
+
+def decode_message(fields: dict[bytes, bytes]) -> dict[str, any]:
+    """Decode a stream entry, accepting legacy one-field-per-key messages"""
+    packed = fields.get(MESSAGE_FIELD.encode(), fields.get(MESSAGE_FIELD))
+    if packed is not None:
+        return unpack_value(packed)
+    return {
+        (key.decode() if isinstance(key, bytes) else key): unpack_value(value) if isinstance(value, bytes) else value
+        for key, value in fields.items()
+    }
@@ -6,5 +6,6 @@ setup(
     packages=find_packages(),
     install_requires=[
         "redis>=5.0.1",
+        "msgpack>=1.0.7",
     ],
 )
@@ -0,0 +1,89 @@
+"""Shared on-disk spool for uploaded files.
+
+When SPOOL_DIR points at a directory shared by the upload and processing
+services (e.g. a mounted volume), uploads are written there and queue
+messages carry the file path instead of the file travelling through Redis.
+Files appear atomically (temp file + rename) and workers map them read-only.
+"""
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from io import BytesIO
+
+SPOOL_DIR = os.getenv("SPOOL_DIR")
+# fsync spooled files (and the directory) before they are announced
+SPOOL_FSYNC = os.getenv("SPOOL_FSYNC", "false").lower() in ("1", "true", "yes")
+
+def spool_path(document_id: str, spool_dir: str | None = None) -> str:
+    return os.path.join(spool_dir or SPOOL_DIR, f"{document_id}.pdf")
+
+def write_spool_file(document_id: str, source, spool_dir: str | None = None, fsync: bool = SPOOL_FSYNC) -> tuple[str, int]:
+    """Atomically write bytes or a binary file object to the spool.
+
+    Returns the final path and the number of bytes written.
+    """
+    spool_dir = spool_dir or SPOOL_DIR
+    path = spool_path(document_id, spool_dir)
+    fd, tmp_path = tempfile.mkstemp(dir=spool_dir, prefix=f".{document_id}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                f.write(source)
+            else:
+                shutil.copyfileobj(source, f, 1024 * 1024)
+            size = f.tell()
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        remove_spool_file(tmp_path)
+        raise
+    if fsync:
+        dir_fd = os.open(spool_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    return path, size
+
+@contextmanager
+def open_spool_file(path: str):
+    """Map a spooled file read-only and yield it as a seekable stream"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # Empty files cannot be mapped
+            yield BytesIO(b'')
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+def resolve_spool_path(path: str, spool_dir: str | None = None) -> str:
+    """Canonical path of a spooled file named in a message.
+
+    Raises ValueError unless the path resolves (symlinks included) to a file
+    inside the spool directory, so a message cannot point workers at, or make
+    them delete, arbitrary files.
+    """
+    spool_dir = spool_dir or SPOOL_DIR
+    if not spool_dir:
+        raise ValueError("SPOOL_DIR is not configured")
+    if not isinstance(path, str):
+        raise ValueError(f"Invalid spool path: {path!r}")
+    root = os.path.realpath(spool_dir)
+    resolved = os.path.realpath(path)
+    if resolved == root or os.path.commonpath([root, resolved]) != root:
+        raise ValueError(f"{path} is outside the spool directory")
+    return resolved
+
+def remove_spool_file(path: str):
+    """Delete a spooled file, ignoring files that are already gone"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,121 @@
+"""Document summary statistics gathered in a single pass over extracted pages.
+
+Pages are fed one at a time and tokens are scanned with a regex iterator, so
+the full text is never joined or split into a token list. Memory stays
+bounded: text density is a fixed histogram of characters per page, top terms
+use a fixed number of Misra-Gries counters and the language guess a handful of
+stopword tallies.
+"""
+import bisect
+import re
+
+_WORD = re.compile(r"\w+")
+
+# Pages with fewer non-whitespace characters than this count as empty
+EMPTY_PAGE_CHARS = 20
+
+# Lower bounds of the characters-per-page histogram buckets
+DENSITY_BUCKETS = (0, 100, 500, 1000, 2000, 4000, 8000)
+
+# Frequent function words per language, used to guess the main language
+_STOPWORDS = {
+    "en": "the and of to in is that for it with as was on are be this by",
+    "de": "der die und das ist nicht mit den von sich auf ein eine dem zu",
+    "fr": "le la les et des est une que dans pour pas sur du au qui",
+    "es": "el la los las y que de en es por con para una del se",
+    "it": "il di che la per non una sono della con nel gli del le",
+    "pt": "que de não uma para com os se por mais as dos como mas",
+    "nl": "de het een en van is dat op te niet zijn met voor die",
+}
+_STOPWORD_LANGUAGES = {}
+for _language, _words in _STOPWORDS.items():
+    for _word in _words.split():
+        _STOPWORD_LANGUAGES.setdefault(_word, []).append(_language)
+
+def _has_min_chars(text: str, minimum: int) -> bool:
+    """Whether text has `minimum` non-whitespace characters, stopping once it does"""
+    found = 0
+    for c in text:
+        if not c.isspace():
+            found += 1
+            if found >= minimum:
+                return True
+    return False
+
+def _bucket_label(index: int) -> str:
+    if index + 1 == len(DENSITY_BUCKETS):
+        return f"{DENSITY_BUCKETS[index]}+"
+    return f"{DENSITY_BUCKETS[index]}-{DENSITY_BUCKETS[index + 1] - 1}"
+
+class TextStats:
+    """Incremental page, word, language and term statistics"""
+
+    def __init__(self, top_terms: int = 10, term_counters: int = 200, preview_chars: int = 200):
+        self.top_terms = top_terms
+        self.term_counters = term_counters
+        self.preview_chars = preview_chars
+        self.page_count = 0
+        self.char_count = 0
+        self.word_count = 0
+        self.density = [0] * len(DENSITY_BUCKETS)
+        self.empty_pages = []
+        self.scanned_pages = []
+        self.preview = ""
+        self._language_hits = {}
+        self._terms = {}
+
+    def add_page(self, text: str, has_images: bool = False):
+        """Account for the next page's extracted text"""
+        self.page_count += 1
+        self.char_count += len(text)
+        self.density[bisect.bisect_right(DENSITY_BUCKETS, len(text)) - 1] += 1
+        if len(self.preview) < self.preview_chars:
+            self.preview += text[:self.preview_chars - len(self.preview)]
+
+        if not _has_min_chars(text, EMPTY_PAGE_CHARS):
+            # A page with images but no text is most likely a scan needing OCR
+            (self.scanned_pages if has_images else self.empty_pages).append(self.page_count)
+
+        for match in _WORD.finditer(text):
+            self.word_count += 1
+            word = match.group().lower()
+            languages = _STOPWORD_LANGUAGES.get(word)
+            if languages:
+                for language in languages:
+                    self._language_hits[language] = self._language_hits.get(language, 0) + 1
+            elif len(word) > 3 and not word.isdigit():
+                self._count_term(word)
+
+    def _count_term(self, word: str):
+        # Misra-Gries: keeps every term with frequency > n / term_counters
+        if word in self._terms:
+            self._terms[word] += 1
+        elif len(self._terms) < self.term_counters:
+            self._terms[word] = 1
+        else:
+            for term in list(self._terms):
+                self._terms[term] -= 1
+                if not self._terms[term]:
+                    del self._terms[term]
+
+    def language(self) -> str | None:
+        """Most likely language code, or None without enough evidence"""
+        if not self._language_hits:
+            return None
+        language, hits = max(self._language_hits.items(), key=lambda item: item[1])
+        return language if hits >= 3 else None
+
+    def summary(self) -> dict:
+        """Statistics to persist with the document"""
+        top = sorted(self._terms.items(), key=lambda item: item[1], reverse=True)[:self.top_terms]
+        return {
+            "page_count": self.page_count,
+            "char_count": self.char_count,
+            "word_count": self.word_count,
+            "language": self.language(),
+            "top_terms": [term for term, _ in top],
+            "avg_chars_per_page": round(self.char_count / self.page_count, 1) if self.page_count else 0,
+            "page_density": {_bucket_label(index): pages for index, pages in enumerate(self.density) if pages},
+            "empty_pages": self.empty_pages,
+            "scanned_pages": self.scanned_pages,
+        }
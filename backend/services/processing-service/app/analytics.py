@@ -0,0 +1,342 @@
+"""Columnar history of processing outcomes.
+
+Workers append one event per finished document to the event log (see
+common/event_log.py). `compact` turns sealed log segments into Parquet files
+sorted by finish time, and `query` aggregates those files with pyarrow without
+touching Redis:
+
+    python app/analytics.py compact --interval 300
+    python app/analytics.py query throughput --since 7d --bucket day
+    python app/analytics.py query parsers --since 24h
+    python app/analytics.py query size-latency --json
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Add the common services directory to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'common')))
+
+from event_log import EVENT_LOG_DIR, EVENT_LOG_SEGMENT_SECONDS, read_segment, seal_idle_segments, sealed_segments
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("processing-analytics")
+
+EVENT_SCHEMA = pa.schema([
+    ("document_id", pa.string()),
+    ("worker", pa.string()),
+    ("parser_type", pa.string()),
+    ("status", pa.string()),
+    ("error_type", pa.string()),
+    ("attempt", pa.int64()),
+    ("file_size", pa.int64()),
+    ("page_count", pa.int64()),
+    ("char_count", pa.int64()),
+    ("word_count", pa.int64()),
+    ("language", pa.string()),
+    ("created_at", pa.timestamp("ms", tz="UTC")),
+    ("started_at", pa.timestamp("ms", tz="UTC")),
+    ("finished_at", pa.timestamp("ms", tz="UTC")),
+])
+_TIMESTAMP_FIELDS = ("created_at", "started_at", "finished_at")
+
+# Rows per compacted file; batches are written as they fill up
+COMPACT_MAX_ROWS = 1_000_000
+# Open segments untouched this long belong to stopped workers
+IDLE_SEGMENT_SECONDS = 2 * EVENT_LOG_SEGMENT_SECONDS
+JOURNAL_NAME = "compaction.json"
+
+def compacted_dir(log_dir: str) -> str:
+    return os.path.join(log_dir, "compacted")
+
+def _tmp_path(path: str) -> str:
+    # Hidden, so readers listing the directory never pick up a partial file
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.tmp")
+
+def _write_atomic(path: str, write):
+    tmp_path = _tmp_path(path)
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+def _write_json(path: str, value):
+    with open(path, "w") as f:
+        json.dump(value, f)
+
+def _remove(paths):
+    for path in paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+def recover_compaction(log_dir: str):
+    """Finish or roll back a compaction interrupted by a crash.
+
+    Segments are only deleted once their Parquet file exists, and the journal
+    lists them so a rerun never compacts the same events twice.
+    """
+    journal_path = os.path.join(log_dir, JOURNAL_NAME)
+    if not os.path.exists(journal_path):
+        return
+    with open(journal_path) as f:
+        journal = json.load(f)
+    if os.path.exists(journal["output"]):
+        _remove(journal["segments"])
+    else:
+        _remove([_tmp_path(journal["output"])])
+    os.unlink(journal_path)
+
+def _events_table(events: list[dict]) -> pa.Table:
+    columns = {name: [event.get(name) for event in events] for name in EVENT_SCHEMA.names}
+    for name in _TIMESTAMP_FIELDS:
+        columns[name] = [int(value * 1000) if value is not None else None for value in columns[name]]
+    table = pa.table({
+        name: pa.array(values, type=pa.int64() if name in _TIMESTAMP_FIELDS else EVENT_SCHEMA.field(name).type)
+        for name, values in columns.items()
+    })
+    # Epoch milliseconds -> timestamps
+    return table.cast(EVENT_SCHEMA)
+
+def _write_batch(log_dir: str, segments: list[str], tables: list[pa.Table]) -> int:
+    output = os.path.join(compacted_dir(log_dir), f"events-{time.time_ns()}.parquet")
+    journal = {"output": output, "segments": segments}
+    _write_atomic(os.path.join(log_dir, JOURNAL_NAME), lambda path: _write_json(path, journal))
+    # Sorted by finish time, so readers can skip row groups outside a time range
+    table = pa.concat_tables(tables).sort_by("finished_at")
+    _write_atomic(output, lambda path: pq.write_table(table, path, compression="zstd"))
+    _remove(segments)
+    os.unlink(os.path.join(log_dir, JOURNAL_NAME))
+    logger.info(f"Compacted {table.num_rows} events from {len(segments)} segments into {output}")
+    return table.num_rows
+
+def compact(log_dir: str, max_rows: int = COMPACT_MAX_ROWS, idle_seconds: float = IDLE_SEGMENT_SECONDS) -> int:
+    """Move all sealed segments into Parquet files; returns the events written"""
+    os.makedirs(compacted_dir(log_dir), exist_ok=True)
+    recover_compaction(log_dir)
+    seal_idle_segments(idle_seconds, log_dir)
+
+    written = 0
+    segments, tables, rows = [], [], 0
+    for segment in sealed_segments(log_dir):
+        # Convert segment by segment; only the columnar form is held in memory
+        table = _events_table(list(read_segment(segment)))
+        segments.append(segment)
+        tables.append(table)
+        rows += table.num_rows
+        if rows >= max_rows:
+            written += _write_batch(log_dir, segments, tables)
+            segments, tables, rows = [], [], 0
+    if rows:
+        written += _write_batch(log_dir, segments, tables)
+    elif segments:
+        # Segments without events (e.g. torn writes only) carry nothing
+        _remove(segments)
+    return written
+
+def load_events(log_dir: str, columns: list[str], since: datetime | None = None) -> pa.Table:
+    """Read compacted events, skipping files and row groups before `since`"""
+    # Only finished files; anything else in the directory (e.g. temp files) is skipped
+    files = sorted(glob.glob(os.path.join(compacted_dir(log_dir), "*.parquet")))
+    if not files:
+        return EVENT_SCHEMA.empty_table().select(columns)
+    dataset = ds.dataset(files, format="parquet", schema=EVENT_SCHEMA)
+    condition = ds.field("finished_at") >= pa.scalar(since, type=EVENT_SCHEMA.field("finished_at").type) if since else None
+    return dataset.to_table(columns=columns, filter=condition)
+
+def _seconds_between(table: pa.Table, start: str, end: str) -> pa.Array:
+    return pc.divide(pc.cast(pc.subtract(table[end], table[start]), pa.int64()), 1000.0)
+
+def _with_durations(table: pa.Table) -> pa.Table:
+    table = table.append_column("processing_seconds", _seconds_between(table, "started_at", "finished_at"))
+    return table.append_column("latency_seconds", _seconds_between(table, "created_at", "finished_at"))
+
+def _status_flags(table: pa.Table) -> pa.Table:
+    for status in ("completed", "failed", "cancelled"):
+        table = table.append_column(status, pc.cast(pc.equal(table["status"], status), pa.int64()))
+    return table
+
+_PERCENTILES = pc.TDigestOptions(q=[0.5, 0.95])
+
+def _rows(table: pa.Table) -> list[dict]:
+    """Turn a grouped table into rows, splitting percentile lists into columns"""
+    rows = []
+    for row in table.to_pylist():
+        for name in [name for name, value in row.items() if name.endswith("_tdigest")]:
+            p50, p95 = row.pop(name) or (None, None)
+            base = name[:-len("_tdigest")]
+            row[f"{base}_p50"], row[f"{base}_p95"] = p50, p95
+        rows.append(row)
+    return rows
+
+def _ratio(numerator, denominator):
+    return round(numerator / denominator, 4) if numerator is not None and denominator else None
+
+def throughput(table: pa.Table, bucket: str = "hour") -> list[dict]:
+    """Documents, pages/sec, failure rate and latency per time bucket"""
+    table = _status_flags(_with_durations(table))
+    table = table.append_column("period", pc.floor_temporal(table["finished_at"], unit=bucket))
+    # Pages only come from completed documents, so only their time counts towards pages/sec
+    completed_seconds = pc.if_else(pc.equal(table["status"], "completed"), table["processing_seconds"], pa.scalar(None, pa.float64()))
+    table = table.append_column("completed_seconds", completed_seconds)
+    grouped = table.group_by("period").aggregate([
+        ("document_id", "count"),
+        ("completed", "sum"),
+        ("failed", "sum"),
+        ("cancelled", "sum"),
+        ("page_count", "sum"),
+        ("completed_seconds", "sum"),
+        ("latency_seconds", "tdigest", _PERCENTILES),
+    ]).sort_by("period")
+    rows = []
+    for row in _rows(grouped):
+        rows.append({
+            "period": row["period"].isoformat(),
+            "documents": row["document_id_count"],
+            "completed": row["completed_sum"],
+            "failed": row["failed_sum"],
+            "cancelled": row["cancelled_sum"],
+            "failure_rate": _ratio(row["failed_sum"], row["document_id_count"]),
+            "pages": row["page_count_sum"],
+            "pages_per_second": _ratio(row["page_count_sum"], row["completed_seconds_sum"]),
+            "latency_p50_s": row["latency_seconds_p50"],
+            "latency_p95_s": row["latency_seconds_p95"],
+        })
+    return rows
+
+def parsers(table: pa.Table) -> list[dict]:
+    """Failure rates and failure causes per parser"""
+    table = _status_flags(table)
+    totals = table.group_by("parser_type").aggregate([
+        ("document_id", "count"),
+        ("failed", "sum"),
+        ("cancelled", "sum"),
+    ])
+    failures = table.filter(pc.equal(table["status"], "failed"))
+    causes = {}
+    for row in failures.group_by(["parser_type", "error_type"]).aggregate([("document_id", "count")]).to_pylist():
+        causes.setdefault(row["parser_type"], {})[row["error_type"] or "unknown"] = row["document_id_count"]
+    return [
+        {
+            "parser_type": row["parser_type"],
+            "documents": row["document_id_count"],
+            "failed": row["failed_sum"],
+            "cancelled": row["cancelled_sum"],
+            "failure_rate": _ratio(row["failed_sum"], row["document_id_count"]),
+            "failures_by_type": causes.get(row["parser_type"], {}),
+        }
+        for row in totals.sort_by("parser_type").to_pylist()
+    ]
+
+def size_latency(table: pa.Table) -> list[dict]:
+    """Processing time of completed documents by power-of-two file size"""
+    table = _with_durations(table)
+    table = table.filter(pc.and_(pc.equal(table["status"], "completed"), pc.greater(table["file_size"], 0)))
+    size_bucket = pc.cast(pc.power(2, pc.floor(pc.log2(table["file_size"]))), pa.int64())
+    table = table.append_column("size_bucket", size_bucket)
+    grouped = table.group_by("size_bucket").aggregate([
+        ("document_id", "count"),
+        ("page_count", "sum"),
+        ("processing_seconds", "sum"),
+        ("processing_seconds", "tdigest", _PERCENTILES),
+    ]).sort_by("size_bucket")
+    return [
+        {
+            "size_from": row["size_bucket"],
+            "size_to": row["size_bucket"] * 2,
+            "documents": row["document_id_count"],
+            "processing_p50_s": row["processing_seconds_p50"],
+            "processing_p95_s": row["processing_seconds_p95"],
+            "pages_per_second": _ratio(row["page_count_sum"], row["processing_seconds_sum"]),
+        }
+        for row in _rows(grouped)
+    ]
+
+REPORTS = {
+    "throughput": (throughput, ["document_id", "status", "page_count", "created_at", "started_at", "finished_at"]),
+    "parsers": (parsers, ["document_id", "parser_type", "status", "error_type"]),
+    "size-latency": (size_latency, ["document_id", "status", "file_size", "page_count", "started_at", "finished_at", "created_at"]),
+}
+
+def parse_since(text: str) -> datetime:
+    """`90m`, `24h`, `7d` ago, or an ISO-8601 date/time (UTC)"""
+    units = {"m": "minutes", "h": "hours", "d": "days"}
+    if text[-1] in units and text[:-1].isdigit():
+        return datetime.now(timezone.utc) - timedelta(**{units[text[-1]]: int(text[:-1])})
+    since = datetime.fromisoformat(text)
+    return since if since.tzinfo else since.replace(tzinfo=timezone.utc)
+
+def print_rows(rows: list[dict]):
+    if not rows:
+        print("No events")
+        return
+    columns = list(rows[0])
+    cells = [[_format(row.get(column)) for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.ljust(width) for cell, width in zip(line, widths)))
+
+def _format(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    if isinstance(value, dict):
+        return ",".join(f"{key}={count}" for key, count in value.items()) or "-"
+    return str(value)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--log-dir", default=EVENT_LOG_DIR, help="Event log directory (default: $EVENT_LOG_DIR)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compact_parser = commands.add_parser("compact", help="Write sealed log segments to Parquet")
+    compact_parser.add_argument("--interval", type=float, help="Keep running, compacting every INTERVAL seconds")
+    compact_parser.add_argument("--max-rows", type=int, default=COMPACT_MAX_ROWS)
+
+    query_parser = commands.add_parser("query", help="Aggregate compacted events")
+    query_parser.add_argument("report", choices=sorted(REPORTS))
+    query_parser.add_argument("--since", type=parse_since, help="e.g. 24h, 7d or 2024-05-01")
+    query_parser.add_argument("--bucket", default="hour", choices=["minute", "hour", "day", "week"], help="throughput period")
+    query_parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+
+    args = parser.parse_args(argv)
+    if not args.log_dir:
+        parser.error("--log-dir or EVENT_LOG_DIR is required")
+
+    if args.command == "compact":
+        while True:
+            try:
+                compact(args.log_dir, args.max_rows)
+            except Exception as e:
+                if args.interval is None:
+                    raise
+                logger.error(f"Compaction failed: {str(e)}", exc_info=True)
+            if args.interval is None:
+                return
+            time.sleep(args.interval)
+
+    report, columns = REPORTS[args.report]
+    table = load_events(args.log_dir, columns, args.since)
+    rows = report(table, args.bucket) if args.report == "throughput" else report(table)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_rows(rows)
+
+if __name__ == "__main__":
+    main()
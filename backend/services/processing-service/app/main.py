@@ -1,14 +1,23 @@
 import sys
 import os
 import asyncio
+import base64
+import importlib
 import logging
+import socket
+import time
+from contextlib import contextmanager
+from datetime import timezone
 
 # Add the common services directory to Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'common')))
 
-from models import DocumentProcessingRequest, DocumentStatus, ParserType
+from models import DocumentStatus, ParserType
 from redis_utils import redis_client
-from pypdf import PdfReader
+from keys import queue_key, worker_shards
+from spool import open_spool_file, remove_spool_file, resolve_spool_path
+from sandbox import ExtractionError, extract_pdf, run_sandboxed
+from event_log import EVENT_LOG_DIR, EventLogWriter
 from io import BytesIO
 
 # Configure logging
@@ -18,170 +27,252 @@ logging.basicConfig(
 )
 logger = logging.getLogger("processing-service")
 
+CONSUMER_GROUP = "pdf_processor_group"
+# Each worker needs a distinct consumer name within the group
+CONSUMER_NAME = os.getenv("CONSUMER_NAME", socket.gethostname())
+# Queue shards are split between WORKER_COUNT workers by WORKER_INDEX
+WORKER_INDEX = int(os.getenv("WORKER_INDEX", 0))
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", 1))
+# How long a claim on a document lasts before another worker may take over
+LEASE_MS = int(os.getenv("PROCESSING_LEASE_MS", 5 * 60 * 1000))
+# Extract in a child process with time and memory limits (see sandbox.py)
+EXTRACTION_SANDBOX = os.getenv("EXTRACTION_SANDBOX", "true").lower() in ("1", "true", "yes")
+
+# Outcomes are appended here when EVENT_LOG_DIR is set (opened in warm_up)
+event_log = None
+
 class PDFProcessor:
     @staticmethod
-    async def process_pdf(file_content: bytes) -> str:
-        """Extract text from PDF using PyPDF"""
+    async def process_pdf(source, is_cancelled=None) -> tuple[list[str], dict]:
+        """Extract the text of each page and its summary statistics in-process"""
         try:
-            pdf = PdfReader(BytesIO(file_content))
-            text = ""
-            for page in pdf.pages:
-                text += page.extract_text() + "\n"
-            return text
+            return extract_pdf(source, is_cancelled)
+        except ExtractionError:
+            raise
         except Exception as e:
-            raise Exception(f"Error extracting text from PDF: {str(e)}")
+            raise ExtractionError("parse_error", f"Error extracting text from PDF: {str(e)}")
+
+def load_file_content(document_id: str) -> bytes:
+    """Bytes of an upload that was stored in its Redis record"""
+    document_metadata = redis_client.get_document_fields(document_id, ['file_content']) or {}
+    file_content = document_metadata.get('file_content') or b''
+    if isinstance(file_content, str):
+        # Records written before the packed format hold base64 text
+        file_content = base64.b64decode(file_content)
+    return file_content
+
+@contextmanager
+def open_document_source(file_path: str | None, file_content: bytes | None):
+    """Yield a readable stream over an uploaded PDF.
+
+    Spooled uploads are memory-mapped straight from disk; uploads made
+    without a spool carry their bytes in the Redis record.
+    """
+    if file_path:
+        with open_spool_file(file_path) as source:
+            yield source
+        return
+    yield BytesIO(file_content or b'')
+
+def is_cancel_requested(document_id: str) -> bool:
+    document_metadata = redis_client.get_document_fields(document_id, ['cancel_requested']) or {}
+    return bool(document_metadata.get('cancel_requested'))
+
+async def extract_document(document_id: str, file_path: str | None, file_content: bytes | None) -> tuple[list[str], dict]:
+    """Extract a document, in a limited child process unless sandboxing is off"""
+    is_cancelled = lambda: is_cancel_requested(document_id)
+    if not EXTRACTION_SANDBOX:
+        with open_document_source(file_path, file_content) as source:
+            return await PDFProcessor.process_pdf(source, is_cancelled)
+    return await run_sandboxed(
+        file_path=file_path,
+        file_content=file_content,
+        is_cancelled=is_cancelled,
+    )
+
+def record_outcome(document_id: str, token: int, parser_type: str, updates: dict, file_size: int | None, started_at: float):
+    """Append a finished document to the event log for analytics"""
+    if event_log is None:
+        return
+    try:
+        created_at = (redis_client.get_document_fields(document_id, ['created_at']) or {}).get('created_at')
+        summary = updates.get('summary') or {}
+        event_log.append({
+            "document_id": document_id,
+            "worker": CONSUMER_NAME,
+            "parser_type": parser_type,
+            "status": updates['status'],
+            "error_type": updates.get('error_type'),
+            "attempt": token,
+            "file_size": file_size,
+            "page_count": updates.get('page_count'),
+            "char_count": summary.get('char_count'),
+            "word_count": summary.get('word_count'),
+            "language": summary.get('language'),
+            "created_at": created_at.replace(tzinfo=timezone.utc).timestamp() if created_at else None,
+            "started_at": started_at,
+            "finished_at": time.time(),
+        })
+    except Exception as e:
+        # Analytics must never hold up processing
+        logger.warning(f"Could not record outcome of document {document_id}: {str(e)}")
+
+async def process_document(document_id: str, token: int, file_path: str | None, parser_type: str):
+    """Process a claimed document based on the parser type.
 
-async def process_document(document_id: str, filename: str, file_content: bytes, parser_type: str):
-    """Process a document based on the parser type"""
+    The outcome is written with the claim's fencing token, so a worker whose
+    lease has been taken over cannot overwrite the newer result.
+    """
+    started_at = time.time()
+    file_size = None
+    pages = None
     try:
-        # Update document status to processing
-        redis_client.update_document_metadata(
-            document_id, 
-            {"status": DocumentStatus.PROCESSING.value}
-        )
         logger.info(f"Processing document {document_id} with parser {parser_type}")
         
         # Process PDF (currently only PyPDF is implemented)
         if parser_type == ParserType.PYPDF.value:
-            text = await PDFProcessor.process_pdf(file_content)
+            file_content = None if file_path else load_file_content(document_id)
+            file_size = os.path.getsize(file_path) if file_path else len(file_content)
+            pages, summary = await extract_document(document_id, file_path, file_content)
             logger.info(f"PDF processing completed for document {document_id}")
             
-            # Update document with processed content
-            redis_client.update_document_metadata(
-                document_id, 
-                {
-                    "content": text,
-                    "status": DocumentStatus.COMPLETED.value
-                }
-            )
-            logger.info(f"Document {document_id} marked as completed")
+            # Store the text next to the record and mark it completed
+            updates = {
+                "page_count": len(pages),
+                "summary": summary,
+                "status": DocumentStatus.COMPLETED.value
+            }
         else:
             logger.error(f"Unsupported parser type: {parser_type}")
-            raise ValueError(f"Unsupported parser type: {parser_type}")
+            raise ExtractionError("unsupported_parser", f"Unsupported parser type: {parser_type}")
         
+    except ExtractionError as e:
+        cancelled = e.error_type == "cancelled"
+        if cancelled:
+            logger.info(f"Processing of document {document_id} was cancelled")
+        else:
+            logger.error(f"Error processing document {document_id} ({e.error_type}): {str(e)}")
+        updates = {
+            "status": (DocumentStatus.CANCELLED if cancelled else DocumentStatus.FAILED).value,
+            "error": str(e),
+            "error_type": e.error_type
+        }
     except Exception as e:
         logger.error(f"Error processing document {document_id}: {str(e)}", exc_info=True)
         # Update document with error status
-        redis_client.update_document_metadata(
-            document_id, 
-            {
-                "status": DocumentStatus.FAILED.value,
-                "error": str(e)
-            }
-        )
-        logger.error(f"Document {document_id} marked as failed")
+        updates = {
+            "status": DocumentStatus.FAILED.value,
+            "error": str(e),
+            "error_type": "internal_error"
+        }
+
+    if redis_client.finish_document(document_id, token, updates, pages):
+        logger.info(f"Document {document_id} processing finished")
+        record_outcome(document_id, token, parser_type, updates, file_size, started_at)
+    else:
+        logger.warning(f"Discarded result for document {document_id}: claim {token} is stale")
+
+def warm_up():
+    """Load the parser and open the Redis connection before consuming.
+
+    pypdf is only imported on the processing path, so pay for it once here
+    instead of on the first message.
+    """
+    global event_log
+    importlib.import_module("pypdf")
+    redis_client.warm_up()
+    if EVENT_LOG_DIR and event_log is None:
+        event_log = EventLogWriter(EVENT_LOG_DIR, CONSUMER_NAME)
+    logger.info("Processing worker warmed up")
+
+async def handle_message(queue_name: str, message_id, message_data: dict):
+    """Process a single message read from one of the queue shards.
+
+    Delivery is at-least-once: the document is claimed first, so duplicates
+    and redeliveries of finished documents are acknowledged without work.
+    """
+    # Safely get required fields
+    document_id = message_data.get('document_id')
+    parser_type = message_data.get('parser_type')
+    
+    # Log the message data for debugging
+    logger.debug(f"Processing message: {message_data}")
+    
+    # Validate required fields
+    if not document_id or not parser_type:
+        logger.error(f"Dropping malformed message: {message_data}")
+        redis_client.acknowledge_message(queue_name, CONSUMER_GROUP, message_id)
+        return
+    
+    file_path = message_data.get('file_path')
+    path_error = None
+    if file_path:
+        try:
+            file_path = resolve_spool_path(file_path)
+        except ValueError as e:
+            # Never open or delete a file outside the spool; fail the document instead
+            path_error = str(e)
+    
+    state, token = redis_client.claim_document(document_id, CONSUMER_NAME, LEASE_MS)
+    if state == "leased":
+        # Another worker holds the lease; if it dies the message is reclaimed
+        logger.info(f"Document {document_id} is being processed elsewhere")
+        return
+    if state == "claimed" and path_error:
+        logger.error(f"Rejecting document {document_id}: {path_error}")
+        updates = {
+            "status": DocumentStatus.FAILED.value,
+            "error": path_error,
+            "error_type": "invalid_spool_path"
+        }
+        if redis_client.finish_document(document_id, token, updates):
+            record_outcome(document_id, token, parser_type, updates, None, time.time())
+    elif state == "claimed":
+        await process_document(document_id, token, file_path, parser_type)
+    else:
+        logger.info(f"Skipping document {document_id}: {state}")
+    
+    # Remove processed message from the queue, then its spooled upload
+    redis_client.acknowledge_message(queue_name, CONSUMER_GROUP, message_id)
+    if file_path and not path_error:
+        remove_spool_file(file_path)
 
 async def start_processing_worker():
-    """Start a worker to process documents from the queue"""
+    """Start a worker to process documents from its queue shards"""
     logger.info("Starting PDF Processing Worker...")
+    warm_up()
+    queue_names = [queue_key(shard) for shard in worker_shards(WORKER_INDEX, WORKER_COUNT)]
+    if not queue_names:
+        raise ValueError(f"Worker {WORKER_INDEX} of {WORKER_COUNT} has no queue shards to consume")
+    logger.info(f"Consumer {CONSUMER_NAME} reading from {', '.join(queue_names)}")
+    # Spread the blocking read budget over the assigned shards
+    timeout_ms = max(1000 // len(queue_names), 1)
     while True:
         try:
-            # Use XREADGROUP for better stream handling
-            results = redis_client.consume_stream(
-                "pdf_processing_queue",
-                "pdf_processor_group",
-                "worker1",
-                timeout_ms=1000
-            )
-            
-            for message_id, message_data in results:
-                # Convert message data to dictionary
-                message_data = dict(message_data)
-                
-                # Safely get required fields
-                document_id = message_data.get('document_id')
-                filename = message_data.get('filename')
-                parser_type = message_data.get('parser_type')
-                
-                # Log the message data for debugging
-                logger.debug(f"Processing message: {message_data}")
-                
-                # Validate required fields
-                if not document_id:
-                    logger.error(f"Message missing document_id: {message_data}")
-                    continue
-                if not filename:
-                    logger.error(f"Message missing filename: {message_data}")
-                    continue
-                if not parser_type:
-                    logger.error(f"Message missing parser_type: {message_data}")
-                    continue
-                
-                # Process the document
-                document_metadata = redis_client.get_document_metadata(document_id)
-                if not document_metadata:
-                    logger.error(f"No metadata found for document {document_id}")
-                    continue
-                
-                # Decode base64 file content
-                file_content = document_metadata.get('file_content')
-                if file_content:
-                    import base64
-                    file_content = base64.b64decode(file_content)
-                else:
-                    file_content = b''
-                
-                # Process the document
-                await process_document(
-                    document_id,
-                    filename,
-                    file_content,
-                    parser_type
+            for queue_name in queue_names:
+                # Use XREADGROUP for better stream handling
+                results = redis_client.consume_stream(
+                    queue_name,
+                    CONSUMER_GROUP,
+                    CONSUMER_NAME,
+                    timeout_ms=timeout_ms
                 )
-                
-                # Remove processed message from the queue
-                redis_client.acknowledge_message("pdf_processing_queue", "pdf_processor_group", message_id)
-                
-                # Process the document
-                document_metadata = redis_client.get_document_metadata(document_id)
-                if not document_metadata:
-                    logger.error(f"No metadata found for document {document_id}")
-                    continue
-                
-                # Decode base64 file content
-                file_content = document_metadata.get('file_content')
-                if file_content:
-                    import base64
-                    file_content = base64.b64decode(file_content)
-                else:
-                    file_content = b''
-                
-                # Process the document
-                await process_document(
-                    document_id,
-                    filename,
-                    file_content,
-                    parser_type
+                # Pick up messages left unacknowledged by a worker whose lease ran out
+                results += redis_client.claim_stale_messages(
+                    queue_name,
+                    CONSUMER_GROUP,
+                    CONSUMER_NAME,
+                    LEASE_MS
                 )
                 
-                # Remove processed message from the queue
-                redis_client.acknowledge_message("pdf_processing_queue", "pdf_processor_group", message_id)
-                document_metadata = redis_client.get_document_metadata(document_id)
-                
-                # Decode base64 file content
-                file_content = document_metadata.get('file_content')
-                if file_content:
-                    import base64
-                    file_content = base64.b64decode(file_content)
-                else:
-                    file_content = b''
-                
-                # Process the document
-                await process_document(
-                    document_id,
-                    message_data['filename'],
-                    file_content,
-                    message_data['parser_type']
-                )
-                
-                # Remove processed message from the queue
-                redis_client.client.xdel("pdf_processing_queue", message_id)
+                for message_id, message_data in results:
+                    await handle_message(queue_name, message_id, message_data)
         
         except Exception as e:
             logger.error(f"Error in processing worker: {str(e)}", exc_info=True)
-        
-        # Avoid tight looping
-        await asyncio.sleep(1)
+            # Back off instead of spinning on a persistent error; otherwise the
+            # blocking read already paces the loop
+            await asyncio.sleep(1)
 
 if __name__ == "__main__":
     asyncio.run(start_processing_worker())
\ No newline at end of file
@@ -1,12 +1,18 @@
 from typing import Dict, Any, Optional
+import sys
 import os
 import json
 import redis.asyncio as redis
-from pypdf import PdfReader
 from pydantic import BaseModel
 from dotenv import load_dotenv
 import asyncio
 
+# Add the common services directory to Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'common')))
+
+from serialization import decode_message, pack_value
+from text_stats import TextStats
+
 load_dotenv()
 
 class ProcessingTask(BaseModel):
@@ -28,30 +34,31 @@ class PDFProcessor:
         self.group_name = os.getenv("PDF_PROCESSOR_GROUP", "pdf_processor_group")
 
     async def process_pdf(self, task: ProcessingTask) -> Dict[str, Any]:
+        from pypdf import PdfReader
+
         try:
             pdf_reader = PdfReader(task.file_path)
             
-            # Extract text from each page
+            # Extract text from each page, gathering statistics as we go
             pages = []
+            stats = TextStats()
             for page_num in range(len(pdf_reader.pages)):
                 page = pdf_reader.pages[page_num]
-                text = page.extract_text()
+                text = page.extract_text() or ""
+                stats.add_page(text)
                 pages.append({
                     "page_number": page_num + 1,
                     "text": text
                 })
 
-            # Create summary (for now, just basic stats)
-            total_pages = len(pages)
-            total_text = " ".join(page["text"] for page in pages)
-            word_count = len(total_text.split())
-
+            summary = stats.summary()
             result = {
                 "pages": pages,
                 "summary": {
-                    "total_pages": total_pages,
-                    "total_words": word_count,
-                    "text_preview": total_text[:200] + "..." if word_count > 200 else total_text
+                    **summary,
+                    "total_pages": summary["page_count"],
+                    "total_words": summary["word_count"],
+                    "text_preview": stats.preview + "..." if stats.char_count > len(stats.preview) else stats.preview
                 }
             }
 
@@ -61,20 +68,20 @@ class PDFProcessor:
             raise Exception(f"Error processing PDF: {str(e)}")
 
     async def process_message(self, message: Dict[str, Any]):
+        # Messages come from our own producers, so skip pydantic re-validation
+        task = ProcessingTask.model_construct(**message)
         try:
-            task = ProcessingTask(**message)
             result = await self.process_pdf(task)
             
             # Update task status in Redis
             task.status = "completed"
             task.result = result
             
-            await self.redis.set(f"task:{task.task_id}", task.json())
-            
         except Exception as e:
             task.status = "failed"
             task.error = str(e)
-            await self.redis.set(f"task:{task.task_id}", task.json())
+
+        await self.redis.set(f"task:{task.task_id}", pack_value(task.__dict__))
 
     async def consume_messages(self):
         try:
@@ -99,7 +106,11 @@ class PDFProcessor:
 
                 if messages:
                     message_id, message_data = messages[0][1][0]
-                    message = json.loads(message_data[b'message'].decode())
+                    if b'message' in message_data:
+                        # Legacy producers send a JSON document
+                        message = json.loads(message_data[b'message'].decode())
+                    else:
+                        message = decode_message(message_data)
                     
                     await self.process_message(message)
                     
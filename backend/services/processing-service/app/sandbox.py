@@ -0,0 +1,201 @@
+"""Sandboxed PDF extraction.
+
+Each document is extracted in a forked child process with CPU-time and
+address-space limits, while the worker's event loop enforces a wall-clock
+deadline and watches for cancellation. A pathological PDF can therefore only
+take down its own child; the outcome is reported as an ExtractionError with
+a machine-readable error_type.
+"""
+import asyncio
+import errno
+import multiprocessing
+import os
+import resource
+import signal
+import time
+from io import BytesIO
+
+from spool import open_spool_file
+from text_stats import TextStats
+
+# Limits applied to each extraction child
+EXTRACTION_CPU_SECONDS = int(os.getenv("EXTRACTION_CPU_SECONDS", 60))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", 120))
+EXTRACTION_MEMORY_MB = int(os.getenv("EXTRACTION_MEMORY_MB", 1024))
+
+# How often the parent checks for results, deadlines and cancellation
+POLL_INTERVAL = 0.1
+CANCEL_CHECK_INTERVAL = 1.0
+
+class ExtractionError(Exception):
+    """Extraction failed; error_type says why (parse_error, timeout, ...)"""
+
+    def __init__(self, error_type: str, message: str):
+        super().__init__(message)
+        self.error_type = error_type
+
+def extract_pdf(source, is_cancelled=None) -> tuple[list[str], dict]:
+    """Extract the text of each page and its summary statistics using PyPDF.
+
+    When given, `is_cancelled` is checked between pages about once a second,
+    for extraction outside the sandbox where nothing else can stop it.
+    """
+    from pypdf import PdfReader
+
+    pdf = PdfReader(source)
+    pages = []
+    stats = TextStats()
+    next_cancel_check = time.monotonic() + CANCEL_CHECK_INTERVAL
+    for page in pdf.pages:
+        if is_cancelled and time.monotonic() >= next_cancel_check:
+            next_cancel_check = time.monotonic() + CANCEL_CHECK_INTERVAL
+            if is_cancelled():
+                raise ExtractionError("cancelled", "Processing was cancelled by request")
+        text = page.extract_text() or ""
+        stats.add_page(text, has_images=has_images(page))
+        pages.append(text)
+    return pages, stats.summary()
+
+def _page_resources(page):
+    """A page's resource dictionary, inherited from the page tree if need be"""
+    node = page
+    while node is not None:
+        resources = node.get("/Resources")
+        if resources is not None:
+            return resources.get_object()
+        parent = node.get("/Parent")
+        node = parent.get_object() if parent is not None else None
+    return None
+
+def has_images(page, max_depth: int = 3) -> bool:
+    """Whether a page draws image XObjects (cheap, nothing is decoded).
+
+    Form XObjects are searched for images as well, since scans are often
+    wrapped in one; other XObjects do not count.
+    """
+    pending = [(_page_resources(page), 0)]
+    seen = set()
+    while pending:
+        resources, depth = pending.pop()
+        if resources is None or "/XObject" not in resources:
+            continue
+        for reference in resources["/XObject"].get_object().values():
+            key = getattr(reference, "idnum", None)
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            xobject = reference.get_object()
+            subtype = xobject.get("/Subtype")
+            if subtype == "/Image":
+                return True
+            if subtype == "/Form" and depth < max_depth:
+                form_resources = xobject.get("/Resources")
+                if form_resources is not None:
+                    pending.append((form_resources.get_object(), depth + 1))
+    return False
+
+def _apply_limits(cpu_seconds: int, memory_mb: int):
+    # SIGXCPU at the soft limit, SIGKILL a little later if it is ignored
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 5))
+    memory = memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+# dlopen/mmap messages when RLIMIT_AS leaves no room for a mapping
+_ALLOCATION_FAILURES = ("failed to map segment", "cannot allocate memory", "out of memory")
+
+def _is_allocation_failure(error: BaseException) -> bool:
+    """Whether an exception (or one it was raised from) is the address-space limit"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, MemoryError):
+            return True
+        if isinstance(error, OSError) and error.errno == errno.ENOMEM:
+            return True
+        if isinstance(error, (OSError, ImportError)) and any(text in str(error).lower() for text in _ALLOCATION_FAILURES):
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def _child_main(conn, file_path: str | None, file_content: bytes | None, cpu_seconds: int, memory_mb: int):
+    try:
+        _apply_limits(cpu_seconds, memory_mb)
+        if file_path:
+            with open_spool_file(file_path) as source:
+                result = extract_pdf(source)
+        else:
+            result = extract_pdf(BytesIO(file_content or b''))
+        conn.send(("ok", result))
+    except Exception as e:
+        # Lazy imports and mmaps hit RLIMIT_AS as ImportError/OSError, not MemoryError
+        if _is_allocation_failure(e):
+            conn.send(("error", ("memory_limit", f"Extraction exceeded {memory_mb} MB")))
+        else:
+            conn.send(("error", ("parse_error", f"Error extracting text from PDF: {str(e)}")))
+    finally:
+        conn.close()
+
+def _exit_error(exitcode: int, cpu_seconds: int, memory_mb: int) -> ExtractionError:
+    if exitcode in (-signal.SIGXCPU, -signal.SIGKILL):
+        return ExtractionError("cpu_limit", f"Extraction exceeded {cpu_seconds}s of CPU time")
+    if exitcode == -signal.SIGSEGV:
+        # Allocation failures inside C code surface as crashes under RLIMIT_AS
+        return ExtractionError("memory_limit", f"Extraction crashed, likely over {memory_mb} MB")
+    return ExtractionError("crashed", f"Extraction process exited with code {exitcode}")
+
+async def run_sandboxed(
+    file_path: str | None = None,
+    file_content: bytes | None = None,
+    is_cancelled=None,
+    cpu_seconds: int = EXTRACTION_CPU_SECONDS,
+    timeout: float = EXTRACTION_TIMEOUT,
+    memory_mb: int = EXTRACTION_MEMORY_MB,
+) -> tuple[list[str], dict]:
+    """Extract a PDF in a limited child process without blocking the event loop.
+
+    `is_cancelled` is polled about once a second; when it returns True the
+    child is killed and a `cancelled` ExtractionError raised.
+    """
+    # fork: the child starts with pypdf already imported by the warmed worker
+    context = multiprocessing.get_context("fork")
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(
+        target=_child_main,
+        args=(child_conn, file_path, file_content, cpu_seconds, memory_mb),
+        daemon=True,
+    )
+    process.start()
+    child_conn.close()
+
+    deadline = time.monotonic() + timeout
+    next_cancel_check = time.monotonic() + CANCEL_CHECK_INTERVAL
+    try:
+        while True:
+            if parent_conn.poll():
+                status, payload = await asyncio.to_thread(parent_conn.recv)
+                if status == "ok":
+                    return payload
+                raise ExtractionError(*payload)
+            if not process.is_alive():
+                if parent_conn.poll():
+                    # The result arrived just before the child exited
+                    continue
+                process.join()
+                raise _exit_error(process.exitcode, cpu_seconds, memory_mb)
+            now = time.monotonic()
+            if now > deadline:
+                raise ExtractionError("timeout", f"Extraction did not finish within {timeout:g}s")
+            if is_cancelled and now >= next_cancel_check:
+                next_cancel_check = now + CANCEL_CHECK_INTERVAL
+                if is_cancelled():
+                    raise ExtractionError("cancelled", "Processing was cancelled by request")
+            await asyncio.sleep(POLL_INTERVAL)
+    except EOFError:
+        process.join()
+        raise _exit_error(process.exitcode, cpu_seconds, memory_mb)
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        parent_conn.close()
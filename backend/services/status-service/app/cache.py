@@ -0,0 +1,67 @@
+"""In-process cache of status responses.
+
+Documents in a terminal state never change, so their responses are kept
+until evicted by the LRU bound. In-flight documents are cached only for a
+short TTL, and any entry can be dropped early when a status-change event
+arrives.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+class StatusCache:
+    def __init__(self, max_entries: int = 10000, inflight_ttl: float = 1.0):
+        self.max_entries = max_entries
+        self.inflight_ttl = inflight_ttl
+        self._entries = OrderedDict()  # document_id -> (expires_at or None, response)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, document_id: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(document_id)
+            if entry is not None:
+                expires_at, response = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._entries.move_to_end(document_id)
+                    self.hits += 1
+                    return response
+                del self._entries[document_id]
+            self.misses += 1
+            return None
+
+    def put(self, document_id: str, response: dict, terminal: bool):
+        expires_at = None if terminal else time.monotonic() + self.inflight_ttl
+        with self._lock:
+            self._entries[document_id] = (expires_at, response)
+            self._entries.move_to_end(document_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, document_id: str):
+        with self._lock:
+            if self._entries.pop(document_id, None) is not None:
+                self.invalidations += 1
+
+    def drop_inflight(self):
+        """Forget every non-terminal entry, e.g. after missing events"""
+        with self._lock:
+            for document_id in [key for key, (expires_at, _) in self._entries.items() if expires_at is not None]:
+                del self._entries[document_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
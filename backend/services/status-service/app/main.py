@@ -1,14 +1,21 @@
 import logging
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 import sys
 import os
+import socket
+import threading
+import time
+from datetime import timezone
 
 # Add the common services directory to Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'common')))
 
 from models import DocumentStatus
-from redis_utils import redis_client
+from redis_utils import TERMINAL_STATUSES, redis_client
+from keys import STATUS_CHANNEL
+from cache import StatusCache
+from event_log import EVENT_LOG_DIR, EventLogWriter
 
 # Configure logging
 logging.basicConfig(
@@ -17,6 +24,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger("status-service")
 
+# Metadata fields served by GET /status/{document_id}
+STATUS_FIELDS = ["filename", "status", "parser_type", "summary", "error", "error_type"]
+
+# Hot documents are polled repeatedly; serve most polls from memory
+status_cache = StatusCache(
+    max_entries=int(os.getenv("STATUS_CACHE_SIZE", 10000)),
+    inflight_ttl=float(os.getenv("STATUS_CACHE_TTL", 1.0))
+)
+
+# Documents cancelled before a worker picked them up never reach a worker's
+# event log, so their outcome is recorded here (opened in warm_up)
+event_log = None
+
 app = FastAPI(title="Status Service", docs_url="/docs", redoc_url="/redoc")
 
 # Configure CORS
@@ -28,32 +48,128 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def listen_for_status_changes():
+    """Drop cached responses as documents change status"""
+    while True:
+        try:
+            pubsub = redis_client.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(STATUS_CHANNEL)
+            for message in pubsub.listen():
+                status_cache.invalidate(message['data'].decode())
+        except Exception as e:
+            logger.warning(f"Status change subscription lost: {str(e)}")
+        # Events may have been missed while disconnected
+        status_cache.drop_inflight()
+        time.sleep(1)
+
+@app.on_event("startup")
+async def warm_up():
+    """Open the Redis connection before the first poll arrives"""
+    global event_log
+    if EVENT_LOG_DIR and event_log is None:
+        event_log = EventLogWriter(EVENT_LOG_DIR, f"status-{socket.gethostname()}-{os.getpid()}")
+    if redis_client.warm_up():
+        logger.info("Status service warmed up")
+    threading.Thread(target=listen_for_status_changes, name="status-invalidation", daemon=True).start()
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: succeeds only once Redis has been reached"""
+    if not redis_client.warmed and not redis_client.warm_up():
+        raise HTTPException(status_code=503, detail="Service is warming up")
+    return {"status": "ready"}
+
 @app.get("/status/{document_id}")
 async def get_document_status(document_id: str):
     """Get the status of a document by its ID"""
     logger.info(f"Received request for document status: {document_id}")
+    cached = status_cache.get(document_id)
+    if cached is not None:
+        return cached
     try:
-        # Retrieve document metadata from Redis
-        document_metadata = redis_client.get_document_metadata(document_id)
+        # Retrieve only the fields we return; the upload and text stay in Redis
+        document_metadata = redis_client.get_document_fields(document_id, STATUS_FIELDS)
         
         if not document_metadata:
             logger.error(f"Document not found: {document_id}")
             raise HTTPException(status_code=404, detail="Document not found")
         
+        preview = redis_client.get_text_preview(document_id, 200)
+
         # Return relevant status information
         logger.info(f"Returning document status: {document_id}")
-        return {
+        response = {
             "document_id": document_id,
             "filename": document_metadata.get('filename', ''),
             "status": document_metadata.get('status', DocumentStatus.PENDING.value),
             "parser_type": document_metadata.get('parser_type', ''),
-            "content_preview": (document_metadata.get('content', '')[:200] + '...') if document_metadata.get('content') else None,
-            "error": document_metadata.get('error')
+            "content_preview": (preview + '...') if preview else None,
+            "summary": document_metadata.get('summary'),
+            "error": document_metadata.get('error'),
+            "error_type": document_metadata.get('error_type')
         }
+        status_cache.put(document_id, response, terminal=response['status'].lower() in TERMINAL_STATUSES)
+        return response
     
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+def record_cancellation(document_id: str):
+    """Append a document cancelled while queued to the event log"""
+    if event_log is None:
+        return
+    try:
+        document_metadata = redis_client.get_document_fields(document_id, ['parser_type', 'created_at']) or {}
+        created_at = document_metadata.get('created_at')
+        event_log.append({
+            "document_id": document_id,
+            "worker": event_log.writer,
+            "parser_type": document_metadata.get('parser_type'),
+            "status": DocumentStatus.CANCELLED.value,
+            "error_type": "cancelled",
+            "created_at": created_at.replace(tzinfo=timezone.utc).timestamp() if created_at else None,
+            "finished_at": time.time(),
+        })
+    except Exception as e:
+        logger.warning(f"Could not record cancellation of document {document_id}: {str(e)}")
+
+@app.delete("/documents/{document_id}")
+async def cancel_document(document_id: str, response: Response):
+    """Cancel a document that has not finished processing.
+
+    Queued documents are cancelled immediately (200); for a document being
+    processed the worker is asked to stop and records the cancellation (202).
+    """
+    logger.info(f"Received cancellation for document: {document_id}")
+    try:
+        state = redis_client.cancel_document(document_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if state == "missing":
+        raise HTTPException(status_code=404, detail="Document not found")
+    if state == "done":
+        raise HTTPException(status_code=409, detail="Document has already finished processing")
+    status_cache.invalidate(document_id)
+    if state == "cancelled":
+        record_cancellation(document_id)
+    if state == "requested":
+        response.status_code = 202
+    return {"document_id": document_id, "cancellation": state}
+
+@app.get("/metrics/cache")
+async def cache_metrics():
+    """Hit ratio and size of the status cache"""
+    return status_cache.stats()
+
 @app.get("/")
 async def root():
-    return {"message": "PDF Status Service is running"}
\ No newline at end of file
+    return {"message": "PDF Status Service is running"}
+
+if __name__ == "__main__":
+    import uvicorn
+    port = int(os.getenv('PORT', 8002))
+    logger.info(f"Starting status service on port {port}")
+    uvicorn.run(app, host="0.0.0.0", port=port)
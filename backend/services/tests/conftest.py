@@ -0,0 +1,35 @@
+import os
+import sys
+
+import fakeredis
+import pytest
+
+SERVICES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# Same layout the services use: common modules are imported top-level
+sys.path.append(os.path.join(SERVICES_DIR, 'common'))
+
+from redis_utils import RedisClient
+
+@pytest.fixture
+def redis_client():
+    """A RedisClient backed by an in-process fake Redis (Lua via lupa)"""
+    client = RedisClient()
+    client._client = fakeredis.FakeRedis()
+    return client
+
+def load_service_main(service: str):
+    """Import a service's app/main.py under a unique module name.
+
+    Its own directory goes on sys.path first, as with `python app/main.py`.
+    """
+    import importlib.util
+    app_dir = os.path.join(SERVICES_DIR, service, 'app')
+    if app_dir not in sys.path:
+        sys.path.insert(0, app_dir)
+    name = service.replace('-', '_') + '_main'
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, os.path.join(app_dir, 'main.py'))
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
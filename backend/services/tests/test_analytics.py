@@ -0,0 +1,69 @@
+from conftest import load_service_main
+
+load_service_main("processing-service")
+import analytics
+
+START = 1_700_000_000.0
+
+def event(document_id, status, pages=None, seconds=1.0, file_size=1000):
+    return {
+        "document_id": document_id,
+        "parser_type": "pypdf",
+        "status": status,
+        "error_type": None if status == "completed" else "timeout",
+        "file_size": file_size,
+        "page_count": pages,
+        "created_at": START,
+        "started_at": START,
+        "finished_at": START + seconds,
+    }
+
+EVENTS = [
+    event("a", "completed", pages=10, seconds=2.0),
+    event("b", "completed", pages=10, seconds=3.0),
+    event("c", "failed", seconds=120.0),
+]
+
+def test_pages_per_second_counts_completed_documents_only():
+    [row] = analytics.throughput(analytics._events_table(EVENTS), bucket="day")
+    assert row["documents"] == 3
+    assert row["failed"] == 1
+    assert row["pages"] == 20
+    assert row["pages_per_second"] == 4.0
+
+def test_size_latency_ignores_failed_documents():
+    [row] = analytics.size_latency(analytics._events_table(EVENTS))
+    assert row["documents"] == 2
+    assert row["pages_per_second"] == 4.0
+    assert (row["size_from"], row["size_to"]) == (512, 1024)
+
+def test_compact_and_query_round_trip(tmp_path):
+    from event_log import EventLogWriter
+
+    writer = EventLogWriter(str(tmp_path), "worker-1")
+    for item in EVENTS:
+        writer.append(item)
+    writer.close()
+    assert analytics.compact(str(tmp_path)) == 3
+    table = analytics.load_events(str(tmp_path), ["document_id", "parser_type", "status", "error_type"])
+    [row] = analytics.parsers(table)
+    assert row["failures_by_type"] == {"timeout": 1}
+
+def test_query_ignores_partial_and_stray_temp_files(tmp_path):
+    from event_log import EventLogWriter
+
+    writer = EventLogWriter(str(tmp_path), "worker-1")
+    for item in EVENTS:
+        writer.append(item)
+    writer.close()
+    analytics.compact(str(tmp_path))
+    compacted = tmp_path / "compacted"
+    # A compaction in progress, and the leftovers of the old temp naming
+    (compacted / ".events-2.parquet.tmp").write_bytes(b"PAR1 partial")
+    (compacted / "events-3.parquet.tmp").write_bytes(b"PAR1 partial")
+
+    table = analytics.load_events(str(tmp_path), ["document_id"])
+    assert sorted(table["document_id"].to_pylist()) == ["a", "b", "c"]
+
+def test_query_without_compacted_files(tmp_path):
+    assert analytics.load_events(str(tmp_path), ["document_id"]).num_rows == 0
@@ -0,0 +1,37 @@
+from redis.cluster import key_slot
+
+from keys import document_key, queue_key, queue_key_for, queue_shard, worker_shards
+
+def test_document_keys_share_a_slot():
+    keys = [document_key("doc-1"), document_key("doc-1", "text"), document_key("doc-1", "pages")]
+    assert keys == ["document:{doc-1}", "document:{doc-1}:text", "document:{doc-1}:pages"]
+    assert len({key_slot(key.encode()) for key in keys}) == 1
+
+def test_single_shard_keeps_plain_queue_name():
+    assert queue_key(0, shards=1) == "pdf_processing_queue"
+    assert queue_shard("doc-1", shards=1) == 0
+    assert queue_key_for("doc-1", shards=1) == "pdf_processing_queue"
+    assert worker_shards(0, 1, shards=1) == [0]
+
+def test_queue_shards_are_hash_tagged_and_spread():
+    keys = [queue_key(shard, shards=4) for shard in range(4)]
+    assert keys[2] == "pdf_processing_queue:{2}"
+    assert len({key_slot(key.encode()) for key in keys}) == 4
+
+    shards = {queue_shard(f"doc-{n}", shards=4) for n in range(100)}
+    assert shards == {0, 1, 2, 3}
+
+def test_document_routes_to_a_stable_shard():
+    shard = queue_shard("doc-1", shards=8)
+    assert 0 <= shard < 8
+    assert queue_shard("doc-1", shards=8) == shard
+    assert queue_key_for("doc-1", shards=8) == queue_key(shard, shards=8)
+
+def test_worker_shards_partition_all_shards():
+    assigned = [worker_shards(index, 3, shards=8) for index in range(3)]
+    assert assigned == [[0, 3, 6], [1, 4, 7], [2, 5]]
+    assert sorted(shard for shards in assigned for shard in shards) == list(range(8))
+
+def test_more_workers_than_shards_leaves_some_idle():
+    assigned = [worker_shards(index, 4, shards=2) for index in range(4)]
+    assert assigned == [[0], [1], [], []]
@@ -0,0 +1,100 @@
+import asyncio
+from functools import partial
+
+import pytest
+
+from conftest import load_service_main
+from keys import document_key
+from models import DocumentStatus
+from serialization import pack_value
+from spool import resolve_spool_path
+from test_redis_utils import store
+
+@pytest.fixture
+def worker(monkeypatch, redis_client):
+    module = load_service_main("processing-service")
+    monkeypatch.setattr(module, "redis_client", redis_client)
+    return module
+
+def queue_message(redis_client, queue_name, message):
+    redis_client.add_to_queue(queue_name, message)
+    return redis_client.consume_stream(queue_name, "pdf_processor_group", "worker-1", timeout_ms=1)
+
+def test_redelivered_message_for_completed_document_is_acked_without_work(worker, redis_client, monkeypatch):
+    store(redis_client, status=DocumentStatus.COMPLETED)
+
+    async def fail_extraction(*args, **kwargs):
+        raise AssertionError("a completed document must not be extracted again")
+    monkeypatch.setattr(worker, "extract_document", fail_extraction)
+
+    [(message_id, message)] = queue_message(redis_client, "queue", {"document_id": "doc-1", "parser_type": "pypdf"})
+    asyncio.run(worker.handle_message("queue", message_id, message))
+
+    assert redis_client.client.xpending("queue", "pdf_processor_group")["pending"] == 0
+    assert redis_client.get_document_fields("doc-1", ["status"])["status"] == DocumentStatus.COMPLETED.value
+
+def test_message_for_leased_document_stays_pending(worker, redis_client, monkeypatch):
+    store(redis_client)
+    redis_client.claim_document("doc-1", "other-worker", 60000)
+
+    [(message_id, message)] = queue_message(redis_client, "queue", {"document_id": "doc-1", "parser_type": "pypdf"})
+    asyncio.run(worker.handle_message("queue", message_id, message))
+
+    # Left for XAUTOCLAIM in case the other worker dies
+    assert redis_client.client.xpending("queue", "pdf_processor_group")["pending"] == 1
+    assert redis_client.client.hget(document_key("doc-1"), "lease_owner") == b"other-worker"
+
+def test_message_with_path_outside_the_spool_fails_the_document(worker, redis_client, monkeypatch, tmp_path):
+    monkeypatch.setattr(worker, "resolve_spool_path", partial(resolve_spool_path, spool_dir=str(tmp_path / "spool")))
+    victim = tmp_path / "victim.pdf"
+    victim.write_bytes(b"keep me")
+    store(redis_client)
+
+    message = {"document_id": "doc-1", "parser_type": "pypdf", "file_path": str(victim)}
+    [(message_id, message)] = queue_message(redis_client, "queue", message)
+    asyncio.run(worker.handle_message("queue", message_id, message))
+
+    assert victim.exists()
+    assert redis_client.client.xpending("queue", "pdf_processor_group")["pending"] == 0
+    record = redis_client.get_document_fields("doc-1", ["status", "error_type"])
+    assert record == {"status": DocumentStatus.FAILED.value, "error_type": "invalid_spool_path"}
+
+def test_worker_without_spool_dir_fails_spooled_documents(worker, redis_client, monkeypatch, tmp_path):
+    monkeypatch.setattr(worker, "resolve_spool_path", partial(resolve_spool_path, spool_dir=None))
+    monkeypatch.setattr("spool.SPOOL_DIR", None)
+    store(redis_client)
+
+    message = {"document_id": "doc-1", "parser_type": "pypdf", "file_path": str(tmp_path / "doc-1.pdf")}
+    [(message_id, message)] = queue_message(redis_client, "queue", message)
+    asyncio.run(worker.handle_message("queue", message_id, message))
+
+    record = redis_client.get_document_fields("doc-1", ["status", "error", "error_type"])
+    assert record["status"] == DocumentStatus.FAILED.value
+    assert record["error_type"] == "invalid_spool_path"
+    assert "SPOOL_DIR" in record["error"]
+
+def pdf_with_pages(count):
+    from io import BytesIO
+    from pypdf import PdfWriter
+
+    writer = PdfWriter()
+    for _ in range(count):
+        writer.add_blank_page(100, 100)
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+def test_in_process_extraction_stops_when_cancelled(worker, redis_client, monkeypatch):
+    import sandbox
+
+    monkeypatch.setattr(worker, "EXTRACTION_SANDBOX", False)
+    monkeypatch.setattr(sandbox, "CANCEL_CHECK_INTERVAL", 0)
+    store(redis_client)
+    redis_client.client.hset(document_key("doc-1"), "file_content", pack_value(pdf_with_pages(3)))
+    _, token = redis_client.claim_document("doc-1", "worker-1", 60000)
+    assert redis_client.cancel_document("doc-1") == "requested"
+
+    asyncio.run(worker.process_document("doc-1", token, None, "pypdf"))
+
+    record = redis_client.get_document_fields("doc-1", ["status", "error_type", "cancel_requested"])
+    assert record == {"status": DocumentStatus.CANCELLED.value, "error_type": "cancelled"}
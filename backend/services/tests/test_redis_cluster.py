@@ -0,0 +1,104 @@
+"""RedisClient in cluster mode (REDIS_CLUSTER_NODES).
+
+The first test swaps RedisCluster for a fake to check how the client is
+built. The others need a real cluster and are skipped unless
+REDIS_CLUSTER_NODES is set, e.g. via `make test-cluster`, which starts the
+nodes from docker-compose.cluster.yml.
+"""
+import os
+import time
+import uuid
+
+import fakeredis
+import pytest
+
+from keys import QUEUE_SHARDS, document_key, queue_key, queue_key_for
+from models import DocumentStatus
+from redis_utils import RedisClient
+from test_redis_utils import store
+
+CLUSTER_NODES = os.getenv("REDIS_CLUSTER_NODES")
+
+def test_cluster_client_is_built_from_seed_nodes(monkeypatch):
+    import redis.cluster
+
+    built = []
+
+    class FakeCluster(fakeredis.FakeRedis):
+        def __init__(self, startup_nodes):
+            super().__init__()
+            built.append([(node.host, node.port) for node in startup_nodes])
+
+    monkeypatch.setattr(redis.cluster, "RedisCluster", FakeCluster)
+    monkeypatch.setenv("REDIS_CLUSTER_NODES", "node-1:7001, node-2:7002,10.0.0.3:7003")
+    client = RedisClient()
+
+    store(client)
+    assert isinstance(client.client, FakeCluster)
+    assert built == [[("node-1", 7001), ("node-2", 7002), ("10.0.0.3", 7003)]]
+    state, token = client.claim_document("doc-1", "worker-1", 60000)
+    assert state == "claimed"
+    assert client.finish_document("doc-1", token, {"status": DocumentStatus.COMPLETED.value}, ["text"])
+
+cluster = pytest.mark.skipif(not CLUSTER_NODES, reason="needs a Redis Cluster in REDIS_CLUSTER_NODES")
+
+@pytest.fixture
+def cluster_client():
+    client = RedisClient()
+    assert client.warm_up()
+    return client
+
+@pytest.fixture
+def document_ids():
+    # Many ids, so the documents spread over every node's slots
+    return [f"cluster-test-{uuid.uuid4()}" for _ in range(20)]
+
+@cluster
+def test_claim_and_finish_on_every_node(cluster_client, document_ids):
+    for document_id in document_ids:
+        store(cluster_client, document_id)
+        state, token = cluster_client.claim_document(document_id, "worker-1", 60000)
+        assert state == "claimed"
+        assert cluster_client.claim_document(document_id, "worker-2", 60000) == ("leased", 0)
+        assert cluster_client.finish_document(document_id, token, {"status": DocumentStatus.COMPLETED.value}, ["a", "b"])
+        assert not cluster_client.finish_document(document_id, token - 1, {"status": DocumentStatus.FAILED.value})
+        assert cluster_client.get_text_preview(document_id, 3) == "a\nb"
+        assert cluster_client.client.lrange(document_key(document_id, "pages"), 0, -1) == [b"a", b"b"]
+
+    nodes = {cluster_client.client.get_node_from_key(document_key(document_id)).name for document_id in document_ids}
+    assert len(nodes) > 1
+
+@cluster
+def test_sharded_queue_consume_and_acknowledge(cluster_client, document_ids):
+    group = f"group-{uuid.uuid4()}"
+    for document_id in document_ids:
+        cluster_client.add_to_queue(queue_key_for(document_id), {"document_id": document_id, "parser_type": "pypdf"})
+
+    seen = []
+    for shard in range(QUEUE_SHARDS):
+        queue_name = queue_key(shard)
+        while True:
+            messages = cluster_client.consume_stream(queue_name, group, "worker-1", timeout_ms=10)
+            if not messages:
+                break
+            for message_id, message in messages:
+                # Pipelined XACK + XDEL (transaction=False) on the shard's node
+                cluster_client.acknowledge_message(queue_name, group, message_id)
+                seen.append(message["document_id"])
+        assert cluster_client.client.xpending(queue_name, group)["pending"] == 0
+    assert set(document_ids) <= set(seen)
+
+@cluster
+def test_status_changes_reach_subscribers(cluster_client, document_ids):
+    from keys import STATUS_CHANNEL
+
+    pubsub = cluster_client.client.pubsub()
+    pubsub.subscribe(STATUS_CHANNEL)
+    assert pubsub.get_message(timeout=1)["type"] == "subscribe"
+    cluster_client.publish_status_change(document_ids[0])
+    deadline = time.monotonic() + 5
+    message = None
+    while message is None and time.monotonic() < deadline:
+        message = pubsub.get_message(ignore_subscribe_messages=True, timeout=0.5)
+    assert message["data"] == document_ids[0].encode()
+    pubsub.close()
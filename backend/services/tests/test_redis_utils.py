@@ -0,0 +1,77 @@
+from keys import document_key
+from models import DocumentMetadata, DocumentStatus, ParserType
+
+def store(redis_client, document_id="doc-1", **fields):
+    record = DocumentMetadata(id=document_id, filename="a.pdf", parser_type=ParserType.PYPDF, **fields).to_record()
+    redis_client.store_document_metadata(document_id, record)
+
+def test_store_and_read_metadata(redis_client):
+    store(redis_client)
+    metadata = redis_client.get_document_metadata("doc-1")
+    assert metadata["filename"] == "a.pdf"
+    assert metadata["status"] == DocumentStatus.PENDING.value
+    assert redis_client.get_document_fields("doc-1", ["status", "error"]) == {"status": "pending"}
+    assert redis_client.get_document_metadata("missing") is None
+
+def test_claim_and_finish(redis_client):
+    store(redis_client)
+    state, token = redis_client.claim_document("doc-1", "worker-1", 60000)
+    assert (state, token) == ("claimed", 1)
+    assert redis_client.get_document_fields("doc-1", ["status"])["status"] == DocumentStatus.PROCESSING.value
+
+    updates = {"status": DocumentStatus.COMPLETED.value, "page_count": 2}
+    assert redis_client.finish_document("doc-1", token, updates, ["first", "second"])
+
+    record = redis_client.get_document_metadata("doc-1")
+    assert record["status"] == DocumentStatus.COMPLETED.value
+    assert record["page_count"] == 2
+    assert "lease_owner" not in record and "lease_until" not in record
+    assert redis_client.client.get(document_key("doc-1", "text")) == b"first\nsecond\n"
+    assert redis_client.client.lrange(document_key("doc-1", "pages"), 0, -1) == [b"first", b"second"]
+    assert redis_client.get_text_preview("doc-1", 3) == "fir"
+
+def test_claim_missing_document(redis_client):
+    assert redis_client.claim_document("missing", "worker-1", 60000) == ("missing", 0)
+
+def test_second_claim_during_lease_is_refused(redis_client):
+    store(redis_client)
+    assert redis_client.claim_document("doc-1", "worker-1", 60000)[0] == "claimed"
+    assert redis_client.claim_document("doc-1", "worker-2", 60000) == ("leased", 0)
+
+def test_claim_after_lease_expiry_gets_a_higher_token(redis_client):
+    store(redis_client)
+    _, first = redis_client.claim_document("doc-1", "worker-1", 60000)
+    # Let the lease run out without waiting for it
+    redis_client.client.hset(document_key("doc-1"), "lease_until", 0)
+    state, second = redis_client.claim_document("doc-1", "worker-2", 60000)
+    assert state == "claimed"
+    assert second > first
+    assert redis_client.client.hget(document_key("doc-1"), "lease_owner") == b"worker-2"
+
+def test_finish_with_stale_token_writes_nothing(redis_client):
+    store(redis_client)
+    _, stale = redis_client.claim_document("doc-1", "worker-1", 60000)
+    redis_client.client.hset(document_key("doc-1"), "lease_until", 0)
+    _, current = redis_client.claim_document("doc-1", "worker-2", 60000)
+
+    updates = {"status": DocumentStatus.FAILED.value, "error": "late"}
+    assert not redis_client.finish_document("doc-1", stale, updates, ["stale text"])
+    record = redis_client.get_document_metadata("doc-1")
+    assert record["status"] == DocumentStatus.PROCESSING.value
+    assert "error" not in record
+    assert not redis_client.client.exists(document_key("doc-1", "text"), document_key("doc-1", "pages"))
+
+    assert redis_client.finish_document("doc-1", current, {"status": DocumentStatus.COMPLETED.value}, ["text"])
+
+def test_finished_document_cannot_be_claimed(redis_client):
+    store(redis_client)
+    _, token = redis_client.claim_document("doc-1", "worker-1", 60000)
+    redis_client.finish_document("doc-1", token, {"status": DocumentStatus.COMPLETED.value}, [])
+    assert redis_client.claim_document("doc-1", "worker-2", 60000) == ("done", 0)
+
+def test_legacy_plain_string_statuses_are_terminal(redis_client):
+    for status in ("completed", "failed"):
+        redis_client.client.hset(document_key(status), mapping={"filename": "a.pdf", "status": status})
+        assert redis_client.claim_document(status, "worker-1", 60000) == ("done", 0)
+    redis_client.client.hset(document_key("legacy-pending"), mapping={"filename": "a.pdf", "status": "pending"})
+    assert redis_client.claim_document("legacy-pending", "worker-1", 60000)[0] == "claimed"
@@ -0,0 +1,106 @@
+import asyncio
+import errno
+
+import pytest
+from pypdf import PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, NameObject, StreamObject
+
+from conftest import load_service_main
+
+load_service_main("processing-service")
+import sandbox
+from sandbox import ExtractionError, _is_allocation_failure, has_images, run_sandboxed
+
+def xobject(writer, subtype, resources=None):
+    stream = StreamObject()
+    stream[NameObject("/Type")] = NameObject("/XObject")
+    stream[NameObject("/Subtype")] = NameObject(subtype)
+    if resources is not None:
+        stream[NameObject("/Resources")] = resources
+    return writer._add_object(stream)
+
+def xobject_resources(**xobjects):
+    return DictionaryObject({
+        NameObject("/XObject"): DictionaryObject({NameObject(f"/{name}"): ref for name, ref in xobjects.items()})
+    })
+
+def blank_page(writer):
+    return writer.add_blank_page(100, 100)
+
+def test_page_without_xobjects():
+    writer = PdfWriter()
+    assert not has_images(blank_page(writer))
+
+def test_image_xobject_counts():
+    writer = PdfWriter()
+    page = blank_page(writer)
+    page[NameObject("/Resources")] = xobject_resources(Im0=xobject(writer, "/Image"))
+    assert has_images(page)
+
+def test_form_without_images_does_not_count():
+    writer = PdfWriter()
+    page = blank_page(writer)
+    page[NameObject("/Resources")] = xobject_resources(Fm0=xobject(writer, "/Form", DictionaryObject()))
+    assert not has_images(page)
+
+def test_image_inside_a_form_counts():
+    writer = PdfWriter()
+    page = blank_page(writer)
+    form = xobject(writer, "/Form", xobject_resources(Im0=xobject(writer, "/Image")))
+    page[NameObject("/Resources")] = xobject_resources(Fm0=form)
+    assert has_images(page)
+
+def test_resources_inherited_from_the_page_tree():
+    writer = PdfWriter()
+    page = blank_page(writer)
+    del page[NameObject("/Resources")]
+    parent = page["/Parent"].get_object()
+    parent[NameObject("/Resources")] = xobject_resources(Im0=xobject(writer, "/Image"))
+    assert has_images(page)
+
+def nested_import_error():
+    try:
+        raise OSError(errno.ENOMEM, "Cannot allocate memory")
+    except OSError as e:
+        try:
+            raise ImportError("could not load extension") from e
+        except ImportError as wrapped:
+            return wrapped
+
+@pytest.mark.parametrize("error, expected", [
+    (MemoryError(), True),
+    (ImportError("libarrow.so: failed to map segment from shared object"), True),
+    (OSError(errno.ENOMEM, "Cannot allocate memory"), True),
+    (nested_import_error(), True),
+    (OSError(errno.ENOENT, "No such file"), False),
+    (ValueError("Stream has ended unexpectedly"), False),
+])
+def test_allocation_failures_are_recognised(error, expected):
+    assert _is_allocation_failure(error) is expected
+
+def run(monkeypatch, extract, **limits):
+    monkeypatch.setattr(sandbox, "extract_pdf", extract)
+    with pytest.raises(ExtractionError) as raised:
+        asyncio.run(run_sandboxed(file_content=b"%PDF", **limits))
+    return raised.value.error_type
+
+def test_import_failing_under_the_memory_limit_is_typed(monkeypatch):
+    def extract(source):
+        raise ImportError("libfoo.so: failed to map segment from shared object")
+    assert run(monkeypatch, extract) == "memory_limit"
+
+def test_allocation_over_the_memory_limit_is_typed(monkeypatch):
+    def extract(source):
+        bytearray(400 * 1024 * 1024)
+    assert run(monkeypatch, extract, memory_mb=200) == "memory_limit"
+
+def test_unparseable_pdf_is_a_parse_error():
+    with pytest.raises(ExtractionError) as raised:
+        asyncio.run(run_sandboxed(file_content=b"not a pdf"))
+    assert raised.value.error_type == "parse_error"
+
+def test_wall_clock_timeout(monkeypatch):
+    def extract(source):
+        while True:
+            pass
+    assert run(monkeypatch, extract, timeout=0.5) == "timeout"
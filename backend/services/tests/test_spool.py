@@ -0,0 +1,24 @@
+import os
+
+import pytest
+
+from spool import resolve_spool_path, write_spool_file
+
+def test_spooled_file_resolves(tmp_path):
+    path, size = write_spool_file("doc-1", b"%PDF", spool_dir=str(tmp_path))
+    assert size == 4
+    assert resolve_spool_path(path, str(tmp_path)) == os.path.realpath(path)
+
+@pytest.mark.parametrize("path", ["/etc/passwd", "{spool}/../outside.pdf", "{spool}", "{spool}-other/doc.pdf", 42])
+def test_paths_outside_the_spool_are_rejected(tmp_path, path):
+    if isinstance(path, str):
+        path = path.format(spool=tmp_path)
+    with pytest.raises(ValueError):
+        resolve_spool_path(path, str(tmp_path))
+
+def test_symlink_out_of_the_spool_is_rejected(tmp_path):
+    spool = tmp_path / "spool"
+    spool.mkdir()
+    (spool / "doc.pdf").symlink_to(tmp_path / "secret")
+    with pytest.raises(ValueError):
+        resolve_spool_path(str(spool / "doc.pdf"), str(spool))
@@ -0,0 +1,92 @@
+import sys
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import load_service_main
+from keys import STATUS_CHANNEL
+from test_redis_utils import store
+from test_status_service import status_service
+
+StatusCache = load_service_main("status-service").StatusCache
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sys.modules[StatusCache.__module__], "time", clock)
+    return clock
+
+def test_lru_bound_evicts_least_recently_used():
+    cache = StatusCache(max_entries=2)
+    cache.put("a", {"id": "a"}, terminal=True)
+    cache.put("b", {"id": "b"}, terminal=True)
+    assert cache.get("a") == {"id": "a"}
+    cache.put("c", {"id": "c"}, terminal=True)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"id": "a"}
+    assert cache.get("c") == {"id": "c"}
+    stats = cache.stats()
+    assert (stats["size"], stats["evictions"]) == (2, 1)
+
+def test_inflight_entries_expire_after_ttl(clock):
+    cache = StatusCache(inflight_ttl=1.0)
+    cache.put("doc-1", {"status": "processing"}, terminal=False)
+    clock.now += 0.5
+    assert cache.get("doc-1") == {"status": "processing"}
+    clock.now += 0.5
+    assert cache.get("doc-1") is None
+    assert cache.stats()["size"] == 0
+
+def test_terminal_entries_never_expire(clock):
+    cache = StatusCache(inflight_ttl=1.0)
+    cache.put("doc-1", {"status": "completed"}, terminal=True)
+    clock.now += 86400
+    assert cache.get("doc-1") == {"status": "completed"}
+
+def test_invalidate_and_drop_inflight():
+    cache = StatusCache()
+    cache.put("done", {"status": "completed"}, terminal=True)
+    cache.put("busy", {"status": "processing"}, terminal=False)
+    cache.invalidate("missing")
+    assert cache.stats()["invalidations"] == 0
+
+    cache.drop_inflight()
+    assert cache.get("busy") is None
+    assert cache.get("done") == {"status": "completed"}
+    cache.invalidate("done")
+    assert cache.get("done") is None
+    assert cache.stats()["invalidations"] == 1
+
+def test_metrics_report_hit_ratio(status_service, redis_client):
+    store(redis_client, status="completed")
+    client = TestClient(status_service.app)
+    assert client.get("/metrics/cache").json()["hit_ratio"] is None
+
+    for _ in range(4):
+        assert client.get("/status/doc-1").json()["status"] == "completed"
+    stats = client.get("/metrics/cache").json()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (3, 1, 0.75)
+
+def test_status_change_event_invalidates_entry(status_service, redis_client):
+    status_service.status_cache.put("doc-1", {"status": "processing"}, terminal=False)
+    threading.Thread(target=status_service.listen_for_status_changes, daemon=True).start()
+    deadline = time.monotonic() + 5
+    while redis_client.client.pubsub_numsub(STATUS_CHANNEL)[0][1] == 0:
+        assert time.monotonic() < deadline, "listener did not subscribe"
+        time.sleep(0.01)
+
+    redis_client.publish_status_change("doc-1")
+    while status_service.status_cache.stats()["invalidations"] == 0:
+        assert time.monotonic() < deadline, "entry was not invalidated"
+        time.sleep(0.01)
+    assert status_service.status_cache.get("doc-1") is None
@@ -0,0 +1,41 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from conftest import load_service_main
+from event_log import EventLogWriter, read_segment, sealed_segments
+from test_redis_utils import store
+
+@pytest.fixture
+def status_service(monkeypatch, redis_client, tmp_path):
+    module = load_service_main("status-service")
+    monkeypatch.setattr(module, "redis_client", redis_client)
+    monkeypatch.setattr(module, "event_log", EventLogWriter(str(tmp_path), "status-test"))
+    monkeypatch.setattr(module, "status_cache", module.StatusCache())
+    return module
+
+def logged_events(module, log_dir):
+    module.event_log.close()
+    return [event for segment in sealed_segments(str(log_dir)) for event in read_segment(segment)]
+
+def test_cancel_queued_document_is_logged(status_service, redis_client, tmp_path):
+    store(redis_client)
+    client = TestClient(status_service.app)
+
+    response = client.delete("/documents/doc-1")
+    assert response.status_code == 200
+    assert client.get("/status/doc-1").json()["status"] == "cancelled"
+    assert client.delete("/documents/doc-1").status_code == 409
+    assert client.delete("/documents/missing").status_code == 404
+
+    [event] = logged_events(status_service, tmp_path)
+    assert event["document_id"] == "doc-1"
+    assert event["status"] == "cancelled"
+    assert event["parser_type"] == "pypdf"
+
+def test_cancel_document_being_processed_is_left_to_the_worker(status_service, redis_client, tmp_path):
+    store(redis_client)
+    redis_client.claim_document("doc-1", "worker-1", 60000)
+
+    response = TestClient(status_service.app).delete("/documents/doc-1")
+    assert response.status_code == 202
+    assert logged_events(status_service, tmp_path) == []
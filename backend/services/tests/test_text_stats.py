@@ -0,0 +1,58 @@
+from text_stats import DENSITY_BUCKETS, TextStats
+
+def test_leading_whitespace_does_not_make_a_page_empty():
+    stats = TextStats()
+    stats.add_page(" " * 100 + "word " * 500)
+    summary = stats.summary()
+    assert summary["empty_pages"] == []
+    assert summary["word_count"] == 500
+
+def test_empty_and_scanned_pages():
+    stats = TextStats()
+    stats.add_page("   \n  ")
+    stats.add_page("", has_images=True)
+    stats.add_page("x" * 20)
+    summary = stats.summary()
+    assert summary["empty_pages"] == [1]
+    assert summary["scanned_pages"] == [2]
+    assert summary["page_count"] == 3
+
+def test_counts_match_split_on_plain_text():
+    pages = ["The quick brown fox\njumps over the lazy dog.", "  Second page,  with\ttabs and 42 numbers  "]
+    stats = TextStats()
+    for page in pages:
+        stats.add_page(page)
+    summary = stats.summary()
+    assert summary["word_count"] == len(" ".join(pages).split())
+    assert summary["char_count"] == sum(len(page) for page in pages)
+    assert summary["avg_chars_per_page"] == round(summary["char_count"] / 2, 1)
+
+def test_language_guess():
+    english = TextStats()
+    english.add_page("This is the report of the committee and it was approved by the board.")
+    assert english.language() == "en"
+
+    german = TextStats()
+    german.add_page("Das ist nicht der Bericht, den die Kommission mit dem Vorstand auf sich nahm.")
+    assert german.language() == "de"
+
+    unknown = TextStats()
+    unknown.add_page("Lorem ipsum dolor sit amet, consectetur adipiscing elit.")
+    assert unknown.language() is None
+
+def test_top_terms_keep_frequent_words_with_bounded_counters():
+    stats = TextStats(top_terms=3, term_counters=5)
+    for index in range(200):
+        stats.add_page(f"invoice payment unique{index:04d} invoice")
+    summary = stats.summary()
+    assert summary["top_terms"][0] == "invoice"
+    assert len(stats._terms) <= 5
+    assert len(summary["top_terms"]) <= 3
+
+def test_page_density_is_a_bounded_histogram():
+    stats = TextStats()
+    for chars in [0, 50, 150, 150, 20000] * 1000:
+        stats.add_page("x" * chars)
+    summary = stats.summary()
+    assert summary["page_density"] == {"0-99": 2000, "100-499": 2000, "8000+": 1000}
+    assert len(stats.density) == len(DENSITY_BUCKETS)
@@ -1,15 +1,17 @@
 import logging
 from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import sys
 import os
-import base64
 
 # Add the common services directory to Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'common')))
 
 from models import ParserType, DocumentMetadata
 from redis_utils import redis_client
+from keys import queue_key_for
+from spool import SPOOL_DIR, write_spool_file, remove_spool_file
 
 # Configure logging
 logging.basicConfig(
@@ -34,6 +36,19 @@ async def root():
     logger.info("Received root endpoint request")
     return {"message": "PDF Upload Service is running"}
 
+@app.on_event("startup")
+async def warm_up():
+    """Open the Redis connection before the first upload arrives"""
+    if redis_client.warm_up():
+        logger.info("Upload service warmed up")
+
+@app.get("/ready")
+async def readiness():
+    """Readiness probe: succeeds only once Redis has been reached"""
+    if not redis_client.warmed and not redis_client.warm_up():
+        raise HTTPException(status_code=503, detail="Service is warming up")
+    return {"status": "ready"}
+
 @app.post("/upload")
 async def upload_document(file: UploadFile = File(...), parser_type: ParserType = ParserType.PYPDF):
     """Upload a PDF document for processing"""
@@ -44,26 +59,36 @@ async def upload_document(file: UploadFile = File(...), parser_type: ParserType
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
     try:
-        # Read file content once
-        content = await file.read()
-        if not content:
-            raise HTTPException(status_code=400, detail="File content is empty")
-        logger.info(f"File {file.filename} read successfully")
-
         # Create document metadata
         document_metadata = DocumentMetadata(
             filename=file.filename,
             parser_type=parser_type
         )
         document_id = document_metadata.id
-        
-        # Convert datetime fields to strings before storing in Redis
-        metadata_dict = document_metadata.dict()
-        metadata_dict['created_at'] = metadata_dict['created_at'].isoformat()
-        metadata_dict['updated_at'] = metadata_dict['updated_at'].isoformat()
-        
-        # Store file content as base64
-        metadata_dict['file_content'] = base64.b64encode(content).decode('utf-8')
+        metadata_dict = document_metadata.to_record()
+        message = {
+            "document_id": document_id,
+            "filename": file.filename,
+            "parser_type": parser_type.value
+        }
+
+        if SPOOL_DIR:
+            # Copy the upload into the shared spool; only its path goes through Redis
+            file_path, size = await run_in_threadpool(write_spool_file, document_id, file.file)
+            if not size:
+                remove_spool_file(file_path)
+                raise HTTPException(status_code=400, detail="File content is empty")
+            metadata_dict['file_path'] = message['file_path'] = file_path
+            logger.info(f"File {file.filename} spooled to {file_path}")
+        else:
+            # Read file content once
+            content = await file.read()
+            if not content:
+                raise HTTPException(status_code=400, detail="File content is empty")
+            logger.info(f"File {file.filename} read successfully")
+
+            # Store the raw file bytes alongside the record, no base64 needed
+            metadata_dict['file_content'] = content
         
         # Store document metadata in Redis
         try:
@@ -71,21 +96,19 @@ async def upload_document(file: UploadFile = File(...), parser_type: ParserType
             logger.info(f"Successfully stored metadata and file content for document {document_id}")
         except Exception as e:
             logger.error(f"Failed to store metadata for document {document_id}: {str(e)}")
+            if SPOOL_DIR:
+                remove_spool_file(file_path)
             raise HTTPException(status_code=500, detail=f"Failed to store document: {str(e)}")
         
         # Add to processing queue
         try:
-            redis_client.add_to_queue(
-                "pdf_processing_queue", 
-                {
-                    "document_id": document_id,
-                    "filename": file.filename,
-                    "parser_type": parser_type.value
-                }
-            )
+            redis_client.add_to_queue(queue_key_for(document_id), message)
             logger.info(f"Added document {document_id} to processing queue")
         except Exception as e:
             logger.error(f"Failed to add document {document_id} to queue: {str(e)}")
+            # Nothing will process the spooled file, so drop it before touching Redis again
+            if SPOOL_DIR:
+                remove_spool_file(file_path)
             redis_client.update_document_metadata(
                 document_id, 
                 {"status": "FAILED", "error": f"Failed to add to processing queue: {str(e)}"}
@@ -94,6 +117,8 @@ async def upload_document(file: UploadFile = File(...), parser_type: ParserType
         
         return {"document_id": document_id, "status": "uploaded"}
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing upload: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
@@ -104,7 +129,7 @@ async def upload_document(file: UploadFile = File(...), parser_type: ParserType
         
         # Add to processing queue
         redis_client.add_to_queue(
-            "pdf_processing_queue", 
+            queue_key_for(document_id), 
             {
                 "document_id": document_id,
                 "filename": upload_request.filename,
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The monolith is imported as the `app` package, as `uvicorn app.main:app` does
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
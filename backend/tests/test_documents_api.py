@@ -0,0 +1,31 @@
+import fakeredis
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers.documents import get_pypdf_service
+from app.services.pypdf_service import PyPDFService
+from keys import document_key
+from serialization import encode_fields
+
+@pytest.fixture
+def service():
+    service = PyPDFService()
+    service.redis_client = fakeredis.FakeRedis()
+    app.dependency_overrides[get_pypdf_service] = lambda: service
+    yield service
+    app.dependency_overrides.clear()
+
+def test_cancelled_document_is_served(service):
+    service.redis_client.hset(document_key("doc-1"), mapping=encode_fields({
+        "id": "doc-1",
+        "filename": "a.pdf",
+        "parser_type": "pypdf",
+        "status": "cancelled",
+        "error": "Processing was cancelled by request",
+        "error_type": "cancelled",
+    }))
+    response = TestClient(app).get("/api/documents/doc-1")
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+    assert response.json()["error_type"] == "cancelled"
@@ -0,0 +1,39 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.routers.documents import accepts_gzip, parse_range
+
+def request(accept_encoding: str) -> Request:
+    return Request({"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]})
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("br, gzip;q=0.5", True),
+    ("br, *;q=0.1", True),
+    ("gzip;q=0", False),
+    ("gzip;q=0, *", False),
+    ("br", False),
+    ("", False),
+])
+def test_accepts_gzip_honours_q_values(header, expected):
+    assert accepts_gzip(request(header)) is expected
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=-5", (95, 99)),
+    ("bytes=50-500", (50, 99)),
+])
+def test_single_ranges(header, expected):
+    assert parse_range(header, 100) == expected
+
+@pytest.mark.parametrize("header", ["", "bytes=0-1,5-6", "items=0-1", "bytes=5-3", "bytes=-"])
+def test_unsupported_ranges_are_ignored(header):
+    assert parse_range(header, 100) is None
+
+def test_unsatisfiable_range():
+    with pytest.raises(HTTPException) as raised:
+        parse_range("bytes=200-", 100)
+    assert raised.value.status_code == 416
+    assert raised.value.headers["Content-Range"] == "bytes */100"